@@ -0,0 +1,145 @@
+import heapq
+import math
+import multiprocessing
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from algorithms.shortest_path import ShortestPathFinder
+
+_worker_graph = None
+
+
+def _init_worker(adjacency, weights, demand):
+    global _worker_graph
+    _worker_graph = (adjacency, weights, demand)
+
+
+def _accumulate(sources):
+    # Brandes dependency accumulation for a batch of sources; returns the
+    # partial node and road scores. Runs in worker processes.
+    adjacency, weights, demand = _worker_graph
+    node_scores = {}
+    road_scores = {}
+
+    for source in sources:
+        # Shortest path DAG from source: path counts and predecessors
+        distances = {source: 0.0}
+        paths = {source: 1}
+        predecessors = {source: []}
+        order = []
+        visited = set()
+        priority_queue = [(0.0, source)]
+        while priority_queue:
+            distance, node = heapq.heappop(priority_queue)
+            if node in visited:
+                continue
+            visited.add(node)
+            order.append(node)
+            for neighbor, road_index in adjacency[node].items():
+                candidate = distance + weights[road_index]
+                if candidate == math.inf:
+                    continue  # closed road
+                known = distances.get(neighbor, math.inf)
+                if candidate < known:
+                    distances[neighbor] = candidate
+                    paths[neighbor] = paths[node]
+                    predecessors[neighbor] = [(node, road_index)]
+                    heapq.heappush(priority_queue, (candidate, neighbor))
+                elif candidate == known and neighbor not in visited:
+                    paths[neighbor] += paths[node]
+                    predecessors[neighbor].append((node, road_index))
+
+        # Pair weights: one per reachable target, or the OD demand
+        targets = demand.get(source) if demand is not None else None
+        dependency = {}
+        for node in reversed(order):
+            pair_weight = (targets.get(node, 0.0) if targets is not None else 1.0) if node != source else 0.0
+            flow = pair_weight + dependency.get(node, 0.0)
+            if flow == 0.0:
+                continue
+            for parent, road_index in predecessors[node]:
+                share = paths[parent] / paths[node] * flow
+                road_scores[road_index] = road_scores.get(road_index, 0.0) + share
+                dependency[parent] = dependency.get(parent, 0.0) + share
+            if node != source:
+                node_scores[node] = node_scores.get(node, 0.0) + dependency.get(node, 0.0)
+
+    return node_scores, road_scores
+
+
+class BetweennessCentrality:
+    def __init__(self, cairo_data):
+        self.data = cairo_data
+        self.path_finder = ShortestPathFinder(cairo_data)
+
+    def compute(self, time_of_day='morning', demand_weighted=False, workers=1):
+        # Weighted betweenness (Brandes) on the slot's routing graph: a node
+        # scores the share of shortest paths between other locations passing
+        # through it, a road the share using it. Every ordered pair counts
+        # once, or with its transport_demand passengers when demand_weighted.
+        # With workers > 1 the sources are split into one batch per worker
+        # for a fork-based process pool, so only call it where forking is
+        # safe (startup, not request threads).
+        global _worker_graph
+        graph = self.path_finder._prepare_graph(time_of_day, False)
+        demand = self._demand() if demand_weighted else None
+        sources = [node for node in graph if demand is None or node in demand]
+        batch_size = max(1, math.ceil(len(sources) / max(1, workers)))
+        batches = [sources[i:i + batch_size] for i in range(0, len(sources), batch_size)]
+        initargs = (graph.adjacency, list(graph.weights), demand)
+
+        if workers > 1 and len(batches) > 1 and 'fork' in multiprocessing.get_all_start_methods():
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(batches)),
+                mp_context=multiprocessing.get_context('fork'),
+                initializer=_init_worker,
+                initargs=initargs
+            ) as pool:
+                partials = list(pool.map(_accumulate, batches))
+        else:
+            _init_worker(*initargs)
+            try:
+                partials = [_accumulate(batch) for batch in batches]
+            finally:
+                _worker_graph = None
+
+        nodes = {node: 0.0 for node in graph}
+        roads = array('d', bytes(8 * len(self.data.existing_roads)))
+        for node_scores, road_scores in partials:
+            for node, score in node_scores.items():
+                nodes[node] += score
+            for road_index, score in road_scores.items():
+                roads[road_index] += score
+
+        return {'nodes': nodes, 'roads': roads}
+
+    def get_centrality(self, time_of_day, demand_weighted=False):
+        name = 'betweenness_demand' if demand_weighted else 'betweenness'
+        # Built lazily on a request thread, so without a process pool; startup
+        # precomputation builds these with one (see data.precompute)
+        return self.data.get_slot_artifact(
+            name, time_of_day,
+            lambda: self.compute(time_of_day, demand_weighted)
+        )
+
+    def ranked_nodes(self, time_of_day):
+        # IDs (as in the source data) of the locations with roads, by
+        # demand-weighted betweenness, ties broken by plain betweenness
+        by_demand = self.get_centrality(time_of_day, demand_weighted=True)['nodes']
+        plain = self.get_centrality(time_of_day)['nodes']
+        locations = self.data.locations
+        ranked = sorted(
+            (node for node in plain if self.data.road_adjacency[node]),
+            key=lambda node: (-by_demand[node], -plain[node], locations.index[node])
+        )
+        return [locations.raw_ids[locations.index[node]] for node in ranked]
+
+    def _demand(self):
+        # {origin: {destination: passengers}} between known locations
+        demand = {}
+        for d in self.data.transport_demand:
+            origin, destination = str(d['from']), str(d['to'])
+            if origin != destination and origin in self.data.road_adjacency and destination in self.data.road_adjacency:
+                targets = demand.setdefault(origin, {})
+                targets[destination] = targets.get(destination, 0.0) + d['passengers']
+        return demand
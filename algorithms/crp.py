@@ -0,0 +1,265 @@
+import heapq
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Customizable route planning: a metric-independent multi-level partition of
+# the road network, computed once per data load, plus a per-metric overlay
+# holding shortest distances between the boundary vertices of every cell.
+# Customizing a metric (a time slot, or live traffic on a few roads) only
+# recomputes those cell cliques, bottom-up and independently per cell.
+
+# Maximum number of locations per cell at each level, finest first; levels
+# that would leave the whole network in one cell are dropped
+LEVEL_CELL_SIZES = (8, 64, 512, 4096)
+
+
+class Partition:
+    """Nested geometric partition of the road graph.
+
+    Locations are split recursively at the coordinate median along the
+    wider axis; a level-l cell is the largest subtree with at most
+    LEVEL_CELL_SIZES[l] locations, so cells nest across levels."""
+
+    def __init__(self, cairo_data, cell_sizes=LEVEL_CELL_SIZES):
+        self.adjacency = cairo_data.road_adjacency
+        self.road_ends = [(str(a), str(b)) for a, b in zip(cairo_data.roads.from_ids, cairo_data.roads.to_ids)]
+        locations = cairo_data.locations
+        points = [(locations.x[locations.index[node]], locations.y[locations.index[node]], node)
+                  for node in self.adjacency]
+
+        self.levels = []  # per level: {node: cell id}
+        for size in cell_sizes:
+            cells = {}
+            self._split(points, size, cells)
+            if len(set(cells.values())) <= 1:
+                break
+            self.levels.append(cells)
+
+        # Boundary vertices per level and cell: endpoints of edges leaving it
+        self.cells = []
+        self.boundary = []
+        for cells in self.levels:
+            members = {}
+            boundary = {}
+            for node, cell in cells.items():
+                members.setdefault(cell, []).append(node)
+                if any(cells[neighbor] != cell for neighbor in self.adjacency[node]):
+                    boundary.setdefault(cell, []).append(node)
+            self.cells.append(members)
+            self.boundary.append(boundary)
+
+    def _split(self, points, size, cells, prefix=''):
+        if len(points) <= size:
+            for _, _, node in points:
+                cells[node] = prefix
+            return
+        xs = [p[0] for p in points]
+        ys = [p[1] for p in points]
+        axis = 0 if max(xs) - min(xs) >= max(ys) - min(ys) else 1
+        points = sorted(points, key=lambda p: (p[axis], p[2]))
+        middle = len(points) // 2
+        self._split(points[:middle], size, cells, prefix + '0')
+        self._split(points[middle:], size, cells, prefix + '1')
+
+    def query_level(self, node, source, target):
+        # Highest level at which node shares a cell with neither endpoint;
+        # 0 means it lies in the finest cell of one of them
+        for level in range(len(self.levels), 0, -1):
+            cells = self.levels[level - 1]
+            if cells[node] != cells[source] and cells[node] != cells[target]:
+                return level
+        return 0
+
+
+def _cell_cliques(task):
+    # Shortest distances between every pair of sources within one cell's
+    # search graph {node: [(neighbor, weight)]}; runs in worker processes
+    sources, adjacency = task
+    cliques = {}
+    for source in sources:
+        distances = {source: 0.0}
+        visited = set()
+        priority_queue = [(0.0, source)]
+        while priority_queue:
+            distance, node = heapq.heappop(priority_queue)
+            if node in visited:
+                continue
+            visited.add(node)
+            for neighbor, weight in adjacency.get(node, ()):
+                candidate = distance + weight
+                if candidate < distances.get(neighbor, math.inf):
+                    distances[neighbor] = candidate
+                    heapq.heappush(priority_queue, (candidate, neighbor))
+        cliques[source] = {
+            other: distances[other] for other in sources
+            if other != source and other in distances
+        }
+    return cliques
+
+
+class Overlay:
+    """Cell cliques of one metric over a Partition.
+
+    graph is the compiled routing graph of the metric; its weights array is
+    read directly, so after live updates change it only the cells
+    containing the changed roads need update_roads().
+
+    The initial customization splits the cells of each level across a
+    fork-based process pool when workers > 1, so only pass workers where
+    forking is safe (startup precompute, not request threads). Updates
+    always run serially."""
+
+    def __init__(self, partition, graph, workers=1):
+        self.partition = partition
+        self.graph = graph
+        self.cliques = [{} for _ in partition.levels]  # per level: {cell: {a: {b: hours}}}
+        self.customize(workers=workers)
+
+    def customize(self, dirty=None, workers=1):
+        # dirty: per level, the cells to recompute (all when None)
+        for level in range(len(self.partition.levels)):
+            cells = self.partition.boundary[level].keys() if dirty is None else dirty[level]
+            tasks = [(cell, self._cell_task(level, cell)) for cell in cells]
+            for cell, cliques in zip([cell for cell, _ in tasks], self._run([task for _, task in tasks], workers)):
+                self.cliques[level][cell] = cliques
+
+    def update_roads(self, road_indexes):
+        # Re-customize only the cells a changed road lies in: the finest cell
+        # holding both of its ends and every cell enclosing that one. Roads
+        # cut at the top level are read directly by queries. Serial, as live
+        # updates arrive on request threads. Returns the number of cells
+        # recomputed.
+        partition = self.partition
+        dirty = [set() for _ in partition.levels]
+        for road_index in road_indexes:
+            a, b = partition.road_ends[road_index]
+            for level, cells in enumerate(partition.levels):
+                if a in cells and cells[a] == cells.get(b) and cells[a] in partition.boundary[level]:
+                    dirty[level].add(cells[a])
+        self.customize(dirty)
+        return sum(len(cells) for cells in dirty)
+
+    def query(self, source, target):
+        # Dijkstra over the overlay: full detail in the finest cells of the
+        # endpoints, cell cliques plus cut edges everywhere else. Returns the
+        # unpacked node path and its length in hours, or (None, inf).
+        partition = self.partition
+        weights = self.graph.weights
+        distances = {source: 0.0}
+        previous = {source: None}  # node -> (parent, level of the step)
+        visited = set()
+        priority_queue = [(0.0, source)]
+
+        while priority_queue:
+            distance, node = heapq.heappop(priority_queue)
+            if node in visited:
+                continue
+            visited.add(node)
+            if node == target:
+                break
+
+            level = partition.query_level(node, source, target)
+            if level == 0:
+                steps = ((neighbor, weights[road_index], 0) for neighbor, road_index in partition.adjacency[node].items())
+            else:
+                cells = partition.levels[level - 1]
+                cell = cells[node]
+                shortcuts = self.cliques[level - 1].get(cell, {}).get(node, {})
+                cut_edges = (
+                    (neighbor, weights[road_index], 0)
+                    for neighbor, road_index in partition.adjacency[node].items() if cells[neighbor] != cell
+                )
+                steps = [(other, hours, level) for other, hours in shortcuts.items()] + list(cut_edges)
+
+            for neighbor, hours, step_level in steps:
+                candidate = distance + hours
+                if candidate < distances.get(neighbor, math.inf):
+                    distances[neighbor] = candidate
+                    previous[neighbor] = (node, step_level)
+                    heapq.heappush(priority_queue, (candidate, neighbor))
+
+        if target not in visited:
+            return None, math.inf
+
+        path = [target]
+        node = target
+        while previous[node] is not None:
+            parent, step_level = previous[node]
+            if step_level == 0:
+                path.append(parent)
+            else:
+                path.extend(reversed(self._unpack(parent, node, step_level)[:-1]))
+            node = parent
+        path.reverse()
+        return path, distances[target]
+
+    def _unpack(self, a, b, level):
+        # Base-graph path a..b inside their shared level cell
+        cells = self.partition.levels[level - 1]
+        cell = cells[a]
+        weights = self.graph.weights
+        distances = {a: 0.0}
+        previous = {a: None}
+        visited = set()
+        priority_queue = [(0.0, a)]
+        while priority_queue:
+            distance, node = heapq.heappop(priority_queue)
+            if node in visited:
+                continue
+            visited.add(node)
+            if node == b:
+                break
+            for neighbor, road_index in self.partition.adjacency[node].items():
+                if cells[neighbor] != cell:
+                    continue
+                candidate = distance + weights[road_index]
+                if candidate < distances.get(neighbor, math.inf):
+                    distances[neighbor] = candidate
+                    previous[neighbor] = node
+                    heapq.heappush(priority_queue, (candidate, neighbor))
+
+        path = [b]
+        while previous[path[-1]] is not None:
+            path.append(previous[path[-1]])
+        path.reverse()
+        return path
+
+    def _cell_task(self, level, cell):
+        # Level 1 cells search the base edges inside the cell; higher cells
+        # search the cliques of their sub-cells joined by the cut edges
+        # between those sub-cells
+        partition = self.partition
+        weights = self.graph.weights
+        cells = partition.levels[level]
+        sources = partition.boundary[level].get(cell, [])
+
+        adjacency = {}
+        if level == 0:
+            for node in partition.cells[level][cell]:
+                adjacency[node] = [
+                    (neighbor, weights[road_index])
+                    for neighbor, road_index in partition.adjacency[node].items() if cells[neighbor] == cell
+                ]
+        else:
+            lower = partition.levels[level - 1]
+            for sub_cell, sub_boundary in partition.boundary[level - 1].items():
+                if cells[sub_boundary[0]] != cell:
+                    continue
+                cliques = self.cliques[level - 1].get(sub_cell, {})
+                for node in sub_boundary:
+                    adjacency[node] = list(cliques.get(node, {}).items()) + [
+                        (neighbor, weights[road_index])
+                        for neighbor, road_index in partition.adjacency[node].items()
+                        if cells[neighbor] == cell and lower[neighbor] != sub_cell
+                    ]
+        return sources, adjacency
+
+    def _run(self, tasks, workers):
+        if workers > 1 and len(tasks) > 1 and 'fork' in multiprocessing.get_all_start_methods():
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(tasks)),
+                mp_context=multiprocessing.get_context('fork')
+            ) as pool:
+                return list(pool.map(_cell_cliques, tasks))
+        return [_cell_cliques(task) for task in tasks]
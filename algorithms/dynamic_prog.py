@@ -1,209 +1,338 @@
-class PublicTransportOptimizer:
-    def __init__(self, cairo_data):
-        self.data = cairo_data
-    
-    def optimize_schedules(self):
-        # Optimize metro schedules using dynamic programming
-        metro_schedules = self._optimize_metro_schedules()
-        
-        # Optimize bus schedules using dynamic programming
-        bus_schedules = self._optimize_bus_schedules()
-        
-        # Optimize resource allocation for road maintenance
-        maintenance_plan = self._optimize_road_maintenance()
-        
-        return {
-            'metro_schedules': metro_schedules,
-            'bus_schedules': bus_schedules,
-            'maintenance_plan': maintenance_plan,
-            'estimated_improvement': self._estimate_improvement(metro_schedules, bus_schedules, maintenance_plan)
-        }
-    
-    def _optimize_metro_schedules(self):
-        # DP approach to optimize metro schedules based on demand
-        results = []
-        
-        for line in self.data.metro_lines:
-            stations = line['stations']
-            passengers = line['passengers']
-            
-            # Create a DP table for scheduling trains between stations
-            n = len(stations)
-            dp = [[0] * n for _ in range(n)]
-            
-            # Base case: direct trips between stations
-            for i in range(n):
-                for j in range(i+1, n):
-                    from_id = stations[i]
-                    to_id = stations[j]
-                    
-                    # Find demand between these stations
-                    demand = next((d['passengers'] for d in self.data.transport_demand 
-                                 if d['from'] == from_id and d['to'] == to_id), 0)
-                    reverse_demand = next((d['passengers'] for d in self.data.transport_demand 
-                                          if d['from'] == to_id and d['to'] == from_id), 0)
-                    total_demand = demand + reverse_demand
-                    
-                    # Calculate optimal frequency (trains per hour)
-                    capacity_per_train = 1000  # passengers per train
-                    min_frequency = max(2, total_demand / capacity_per_train / 18)  # at least 2 trains/hour
-                    
-                    dp[i][j] = min_frequency
-            
-            # Fill DP table for multi-segment trips
-            for length in range(2, n):
-                for i in range(n - length):
-                    j = i + length
-                    min_freq = float('inf')
-                    
-                    for k in range(i+1, j):
-                        freq = max(dp[i][k], dp[k][j])
-                        if freq < min_freq:
-                            min_freq = freq
-                    
-                    dp[i][j] = min(dp[i][j], min_freq)
-            
-            # Determine final schedule
-            optimal_frequency = dp[0][n-1]
-            trains_needed = max(4, int(optimal_frequency * 18))  # 18 operating hours
-            
-            results.append({
-                'line_id': line['id'],
-                'line_name': line['name'],
-                'optimal_frequency': optimal_frequency,
-                'trains_needed': trains_needed,
-                'current_trains': trains_needed,  # In real implementation, compare with current
-                'stations': stations,
-                'station_names': [self.data.get_location_name(s) for s in stations]
-            })
-        
-        return results
-    
-    def _optimize_bus_schedules(self):
-        # Similar DP approach for bus routes
-        results = []
-        
-        for route in self.data.bus_routes:
-            stops = route['stops']
-            current_buses = route['buses']
-            passengers = route['passengers']
-            
-            # Calculate demand along the route
-            total_demand = 0
-            for i in range(len(stops)):
-                for j in range(i+1, len(stops)):
-                    from_id = stops[i]
-                    to_id = stops[j]
-                    
-                    demand = next((d['passengers'] for d in self.data.transport_demand 
-                                 if d['from'] == from_id and d['to'] == to_id), 0)
-                    reverse_demand = next((d['passengers'] for d in self.data.transport_demand 
-                                          if d['from'] == to_id and d['to'] == from_id), 0)
-                    total_demand += demand + reverse_demand
-            
-            # Calculate optimal number of buses
-            capacity_per_bus = 50  # passengers per bus
-            trips_per_bus_per_day = 10  # average trips per bus
-            optimal_buses = max(2, total_demand / (capacity_per_bus * trips_per_bus_per_day))
-            
-            results.append({
-                'route_id': route['id'],
-                'optimal_buses': optimal_buses,
-                'current_buses': current_buses,
-                'stops': stops,
-                'stop_names': [self.data.get_location_name(s) for s in stops],
-                'demand': total_demand,
-                'utilization': passengers / (current_buses * capacity_per_bus * trips_per_bus_per_day) if current_buses > 0 else 0
-            })
-        
-        return results
-    
-    def _optimize_road_maintenance(self):
-        # Knapsack problem approach for road maintenance allocation
-        roads = self.data.existing_roads.copy()
-        budget = 500  # million EGP
-        
-        # Add a value score for each road based on condition, traffic, and importance
-        for road in roads:
-            traffic = max(
-                self.data.get_road_traffic(road['from'], road['to'], 'morning'),
-                self.data.get_road_traffic(road['from'], road['to'], 'evening')
-            )
-            
-            # Calculate importance score
-            from_node = self.data.get_neighborhood(road['from']) or self.data.get_facility(road['from'])
-            to_node = self.data.get_neighborhood(road['to']) or self.data.get_facility(road['to'])
-            
-            population_factor = 0
-            if from_node and to_node:
-                population_factor = (from_node.get('population', 0) + to_node.get('population', 0)) / 1000000
-            
-            critical_factor = 1
-            if (isinstance(road['from'], str) and road['from'].startswith('F')) or \
-               (isinstance(road['to'], str) and road['to'].startswith('F')):
-                critical_factor = 2
-            
-            condition = road['condition']
-            improvement_possible = (10 - condition) * 0.5  # 0.5 point improvement per million
-            
-            road['value'] = traffic * (1 + population_factor) * critical_factor * improvement_possible
-            road['cost'] = (10 - condition) * 5  # million EGP to improve to condition 10
-        
-        # 0/1 Knapsack DP solution
-        n = len(roads)
-        dp = [[0] * (budget + 1) for _ in range(n + 1)]
-        
-        for i in range(1, n + 1):
-            road = roads[i-1]
-            for w in range(1, budget + 1):
-                if road['cost'] <= w:
-                    dp[i][w] = max(dp[i-1][w], dp[i-1][w - road['cost']] + road['value'])
-                else:
-                    dp[i][w] = dp[i-1][w]
-        
-        # Backtrack to find selected roads
-        selected = []
-        w = budget
-        total_cost = 0
-        total_value = 0
-        
-        for i in range(n, 0, -1):
-            if dp[i][w] != dp[i-1][w]:
-                road = roads[i-1]
-                selected.append(road)
-                w -= road['cost']
-                total_cost += road['cost']
-                total_value += road['value']
-        
-        return {
-            'selected_roads': selected,
-            'total_cost': total_cost,
-            'total_value': total_value,
-            'average_improvement': sum(10 - r['condition'] for r in selected) / len(selected) if selected else 0
-        }
-    
-    def _estimate_improvement(self, metro_schedules, bus_schedules, maintenance_plan):
-        # Estimate overall improvement from optimizations
-        metro_improvement = 0
-        for metro in metro_schedules:
-            if metro['current_trains'] > 0:
-                metro_improvement += (metro['trains_needed'] / metro['current_trains']) * 0.2  # up to 20% improvement
-        
-        bus_improvement = 0
-        for bus in bus_schedules:
-            if bus['current_buses'] > 0:
-                utilization = bus['utilization']
-                if utilization > 1:
-                    improvement = (bus['optimal_buses'] / bus['current_buses']) * 0.15  # up to 15% improvement
-                    bus_improvement += improvement
-        
-        road_improvement = maintenance_plan['average_improvement'] * 0.05 if maintenance_plan['selected_roads'] else 0
-        
-        total_improvement = min(0.5, (metro_improvement + bus_improvement + road_improvement) / 3)
-        
-        return {
-            'metro': metro_improvement,
-            'bus': bus_improvement,
-            'road': road_improvement,
-            'total': total_improvement
+import heapq
+
+from algorithms.centrality import BetweennessCentrality
+
+BUS_CAPACITY = 50  # passengers per bus
+BUS_TRIPS_PER_DAY = 10  # average trips per bus
+
+
+class PublicTransportOptimizer:
+    def __init__(self, cairo_data):
+        self.data = cairo_data
+    
+    def optimize_schedules(self, fleet_size=None):
+        # Optimize metro schedules using dynamic programming
+        metro_schedules = self._optimize_metro_schedules()
+        
+        # Optimize bus schedules using dynamic programming
+        bus_schedules = self._optimize_bus_schedules()
+        
+        # Distribute a fixed fleet (default: the buses in service) across routes
+        fleet_allocation = self._allocate_fleet(bus_schedules, fleet_size)
+        
+        # Optimize resource allocation for road maintenance
+        maintenance_plan = self._optimize_road_maintenance()
+        
+        return {
+            'metro_schedules': metro_schedules,
+            'bus_schedules': bus_schedules,
+            'fleet_allocation': fleet_allocation,
+            'maintenance_plan': maintenance_plan,
+            'estimated_improvement': self._estimate_improvement(metro_schedules, bus_schedules, maintenance_plan)
+        }
+    
+    def iter_schedules(self, fleet_size=None):
+        # Streaming variant of optimize_schedules: yields one record per
+        # metro line, bus route and selected maintenance road as it is computed,
+        # the fleet allocation, then the maintenance summary and the
+        # improvement estimate
+        metro_schedules = []
+        for schedule in self._iter_metro_schedules():
+            metro_schedules.append(schedule)
+            yield {'type': 'metro_schedule', **schedule}
+        
+        bus_schedules = []
+        for schedule in self._iter_bus_schedules():
+            bus_schedules.append(schedule)
+            yield {'type': 'bus_schedule', **schedule}
+        
+        yield {'type': 'fleet_allocation', **self._allocate_fleet(bus_schedules, fleet_size)}
+        
+        maintenance_plan = self._optimize_road_maintenance()
+        for road in maintenance_plan['selected_roads']:
+            yield {'type': 'maintenance_road', **road}
+        
+        yield {
+            'type': 'maintenance_summary',
+            'total_cost': maintenance_plan['total_cost'],
+            'total_value': maintenance_plan['total_value'],
+            'average_improvement': maintenance_plan['average_improvement']
+        }
+        yield {
+            'type': 'estimated_improvement',
+            **self._estimate_improvement(metro_schedules, bus_schedules, maintenance_plan)
+        }
+    
+    def _optimize_metro_schedules(self):
+        return list(self._iter_metro_schedules())
+    
+    def _iter_metro_schedules(self):
+        # DP approach to optimize metro schedules based on demand
+        for line in self.data.metro_lines:
+            stations = line['stations']
+            passengers = line['passengers']
+            
+            # Create a DP table for scheduling trains between stations
+            n = len(stations)
+            dp = [[0] * n for _ in range(n)]
+            
+            # Base case: direct trips between stations
+            for i in range(n):
+                for j in range(i+1, n):
+                    from_id = stations[i]
+                    to_id = stations[j]
+                    
+                    # Find demand between these stations
+                    demand = next((d['passengers'] for d in self.data.transport_demand 
+                                 if d['from'] == from_id and d['to'] == to_id), 0)
+                    reverse_demand = next((d['passengers'] for d in self.data.transport_demand 
+                                          if d['from'] == to_id and d['to'] == from_id), 0)
+                    total_demand = demand + reverse_demand
+                    
+                    # Calculate optimal frequency (trains per hour)
+                    capacity_per_train = 1000  # passengers per train
+                    min_frequency = max(2, total_demand / capacity_per_train / 18)  # at least 2 trains/hour
+                    
+                    dp[i][j] = min_frequency
+            
+            # Fill DP table for multi-segment trips
+            for length in range(2, n):
+                for i in range(n - length):
+                    j = i + length
+                    min_freq = float('inf')
+                    
+                    for k in range(i+1, j):
+                        freq = max(dp[i][k], dp[k][j])
+                        if freq < min_freq:
+                            min_freq = freq
+                    
+                    dp[i][j] = min(dp[i][j], min_freq)
+            
+            # Determine final schedule
+            optimal_frequency = dp[0][n-1]
+            trains_needed = max(4, int(optimal_frequency * 18))  # 18 operating hours
+            
+            yield {
+                'line_id': line['id'],
+                'line_name': line['name'],
+                'optimal_frequency': optimal_frequency,
+                'trains_needed': trains_needed,
+                'current_trains': trains_needed,  # In real implementation, compare with current
+                'stations': stations,
+                'station_names': [self.data.get_location_name(s) for s in stations]
+            }
+    
+    def _optimize_bus_schedules(self):
+        return list(self._iter_bus_schedules())
+    
+    def _iter_bus_schedules(self):
+        # Similar DP approach for bus routes
+        for route in self.data.bus_routes:
+            stops = route['stops']
+            current_buses = route['buses']
+            passengers = route['passengers']
+            
+            # Calculate demand along the route
+            total_demand = 0
+            for i in range(len(stops)):
+                for j in range(i+1, len(stops)):
+                    from_id = stops[i]
+                    to_id = stops[j]
+                    
+                    demand = next((d['passengers'] for d in self.data.transport_demand 
+                                 if d['from'] == from_id and d['to'] == to_id), 0)
+                    reverse_demand = next((d['passengers'] for d in self.data.transport_demand 
+                                          if d['from'] == to_id and d['to'] == from_id), 0)
+                    total_demand += demand + reverse_demand
+            
+            # Calculate optimal number of buses
+            capacity_per_bus = BUS_CAPACITY
+            trips_per_bus_per_day = BUS_TRIPS_PER_DAY
+            optimal_buses = max(2, total_demand / (capacity_per_bus * trips_per_bus_per_day))
+            
+            yield {
+                'route_id': route['id'],
+                'optimal_buses': optimal_buses,
+                'current_buses': current_buses,
+                'stops': stops,
+                'stop_names': [self.data.get_location_name(s) for s in stops],
+                'demand': total_demand,
+                'utilization': passengers / (current_buses * capacity_per_bus * trips_per_bus_per_day) if current_buses > 0 else 0
+            }
+    
+    def _allocate_fleet(self, bus_schedules, fleet_size=None):
+        # Resource allocation: serve the most demand with at most fleet_size
+        # buses, a route with k buses serving min(demand, k * per_bus). Among
+        # equally good allocations the one moving the fewest buses wins:
+        # each moved bus costs less than all of them together can outweigh
+        # one passenger. Every route's gain is concave in k, so taking the
+        # best marginal bus first is optimal; the marginal gain is constant
+        # between a route's breakpoints, so whole runs are taken at once.
+        if fleet_size is None:
+            fleet_size = sum(s['current_buses'] for s in bus_schedules)
+        per_bus = BUS_CAPACITY * BUS_TRIPS_PER_DAY
+        move_penalty = 1 / (2 * (fleet_size + sum(s['current_buses'] for s in bus_schedules) + 1))
+        
+        # (-marginal gain, -route, k, count) per run of buses k + 1..k + count; on
+        # equal gains later routes are served first
+        runs = []
+        for r, schedule in enumerate(bus_schedules):
+            for k, count, marginal in self._marginal_runs(schedule['demand'], schedule['current_buses'], per_bus, move_penalty):
+                if marginal > 0:
+                    heapq.heappush(runs, (-marginal, -r, k, count))
+        
+        allocation = [0] * len(bus_schedules)
+        spare = fleet_size
+        while runs and spare > 0:
+            _, r, _, count = heapq.heappop(runs)
+            taken = min(count, spare)
+            allocation[-r] += taken
+            spare -= taken
+        
+        routes = []
+        for schedule, buses in zip(bus_schedules, allocation):
+            routes.append({
+                'route_id': schedule['route_id'],
+                'buses': buses,
+                'current_buses': schedule['current_buses'],
+                'change': buses - schedule['current_buses'],
+                'demand': schedule['demand'],
+                'served_demand': min(schedule['demand'], buses * per_bus)
+            })
+        
+        served = sum(r['served_demand'] for r in routes)
+        total_demand = sum(s['demand'] for s in bus_schedules)
+        return {
+            'fleet_size': fleet_size,
+            'allocated_buses': sum(allocation),
+            'spare_buses': fleet_size - sum(allocation),
+            'served_demand': served,
+            'total_demand': total_demand,
+            'served_share': served / total_demand if total_demand else 0,
+            'routes': routes
+        }
+    
+    def _marginal_runs(self, demand, current, per_bus, move_penalty):
+        # (k, count, gain) for buses k + 1..k + count of one route, each
+        # adding gain; breakpoints are full buses, the partly filled bus and
+        # the current fleet. Past both demand and current fleet a bus only
+        # loses, so the runs stop there.
+        full = int(demand // per_bus)
+        remainder = demand - full * per_bus
+        useful = max(full + (1 if remainder > 0 else 0), current)
+        bounds = sorted({0, full, min(full + 1, useful), current, useful})
+        runs = []
+        for k, end in zip(bounds, bounds[1:]):
+            served = per_bus if k < full else (remainder if k == full else 0)
+            penalty = move_penalty if k < current else -move_penalty
+            runs.append((k, end - k, served + penalty))
+        return runs
+    
+    def _optimize_road_maintenance(self):
+        # Knapsack problem approach for road maintenance allocation. Scores
+        # live in parallel lists so the shared road records stay untouched.
+        roads = self.data.existing_roads
+        table = self.data.roads
+        locations = self.data.locations
+        budget = 500  # million EGP
+        
+        # Value score for each road based on condition, traffic, and importance
+        through_traffic = self._through_traffic_shares()
+        values = []
+        costs = []
+        for i, road in enumerate(roads):
+            traffic = max(
+                self.data.get_road_traffic(road['from'], road['to'], 'morning'),
+                self.data.get_road_traffic(road['from'], road['to'], 'evening')
+            )
+            
+            # Calculate importance score
+            from_index = table.from_index[i]
+            to_index = table.to_index[i]
+            
+            population_factor = 0
+            if from_index >= 0 and to_index >= 0:
+                population_factor = (locations.population[from_index] + locations.population[to_index]) / 1000000
+            
+            critical_factor = 1
+            if (isinstance(road['from'], str) and road['from'].startswith('F')) or \
+               (isinstance(road['to'], str) and road['to'].startswith('F')):
+                critical_factor = 2
+            
+            condition = road['condition']
+            improvement_possible = (10 - condition) * 0.5  # 0.5 point improvement per million
+            
+            values.append(traffic * (1 + population_factor) * critical_factor * improvement_possible * (1 + through_traffic[i]))
+            costs.append((10 - condition) * 5)  # million EGP to improve to condition 10
+        
+        # 0/1 Knapsack DP solution
+        n = len(roads)
+        dp = [[0] * (budget + 1) for _ in range(n + 1)]
+        
+        for i in range(1, n + 1):
+            cost = costs[i-1]
+            value = values[i-1]
+            previous_row = dp[i-1]
+            row = dp[i]
+            for w in range(1, budget + 1):
+                if cost <= w:
+                    row[w] = max(previous_row[w], previous_row[w - cost] + value)
+                else:
+                    row[w] = previous_row[w]
+        
+        # Backtrack to find selected roads
+        selected = []
+        w = budget
+        total_cost = 0
+        total_value = 0
+        
+        for i in range(n, 0, -1):
+            if dp[i][w] != dp[i-1][w]:
+                selected.append({**roads[i-1], 'value': values[i-1], 'cost': costs[i-1]})
+                w -= costs[i-1]
+                total_cost += costs[i-1]
+                total_value += values[i-1]
+        
+        return {
+            'selected_roads': selected,
+            'total_cost': total_cost,
+            'total_value': total_value,
+            'average_improvement': sum(10 - r['condition'] for r in selected) / len(selected) if selected else 0
+        }
+    
+    def _through_traffic_shares(self):
+        # Per road, the larger of its morning and evening demand-weighted
+        # betweenness relative to the busiest road (0-1)
+        centrality = BetweennessCentrality(self.data)
+        shares = [0.0] * len(self.data.existing_roads)
+        for time_of_day in ('morning', 'evening'):
+            roads = centrality.get_centrality(time_of_day, demand_weighted=True)['roads']
+            top = max(roads, default=0) or 1
+            shares = [max(share, score / top) for share, score in zip(shares, roads)]
+        return shares
+    
+    def _estimate_improvement(self, metro_schedules, bus_schedules, maintenance_plan):
+        # Estimate overall improvement from optimizations
+        metro_improvement = 0
+        for metro in metro_schedules:
+            if metro['current_trains'] > 0:
+                metro_improvement += (metro['trains_needed'] / metro['current_trains']) * 0.2  # up to 20% improvement
+        
+        bus_improvement = 0
+        for bus in bus_schedules:
+            if bus['current_buses'] > 0:
+                utilization = bus['utilization']
+                if utilization > 1:
+                    improvement = (bus['optimal_buses'] / bus['current_buses']) * 0.15  # up to 15% improvement
+                    bus_improvement += improvement
+        
+        road_improvement = maintenance_plan['average_improvement'] * 0.05 if maintenance_plan['selected_roads'] else 0
+        
+        total_improvement = min(0.5, (metro_improvement + bus_improvement + road_improvement) / 3)
+        
+        return {
+            'metro': metro_improvement,
+            'bus': bus_improvement,
+            'road': road_improvement,
+            'total': total_improvement
         }
\ No newline at end of file
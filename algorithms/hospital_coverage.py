@@ -0,0 +1,226 @@
+import bisect
+import heapq
+import math
+from array import array
+
+from algorithms.shortest_path import ShortestPathFinder
+
+# Assignment cost of an incident no hospital slot can reach; large enough
+# that serving one more incident always beats any total of real ETAs
+UNREACHABLE = 1e9
+
+
+class HospitalCoverage:
+    def __init__(self, cairo_data):
+        self.data = cairo_data
+        self.path_finder = ShortestPathFinder(cairo_data)
+
+    def nearest_hospital_route(self, start, time_of_day='morning'):
+        coverage = self.get_coverage(time_of_day)
+        start = str(start)
+
+        if start not in coverage['nearest']:
+            return {'path': [], 'distance': 0, 'time': 0, 'error': 'No reachable medical facility'}
+
+        # Follow the coverage tree towards the hospital that claimed start
+        path = [start]
+        while coverage['next_hop'][path[-1]] is not None:
+            path.append(coverage['next_hop'][path[-1]])
+
+        hospital = coverage['nearest'][start]
+        result = self.path_finder._build_result(path, time_of_day, emergency=True)
+        result['hospital'] = hospital
+        result['hospital_name'] = self.data.get_location_name(hospital)
+        result['eta'] = coverage['eta'][start]
+        return result
+
+    def isochrone(self, minutes, time_of_day='morning', hospital=None):
+        # Nodes whose nearest hospital (or the given one, where it is the
+        # nearest) is within the given minutes; O(log n + output)
+        coverage = self.get_coverage(time_of_day)
+        if hospital is None:
+            order = coverage['order']
+        else:
+            order = coverage['order_by_hospital'].get(str(hospital), [])
+
+        cutoff = bisect.bisect_right(order, (minutes, chr(0x10FFFF)))
+        return [
+            {
+                'id': node,
+                'name': self.data.get_location_name(node),
+                'eta': eta,
+                'hospital': coverage['nearest'][node]
+            }
+            for eta, node in order[:cutoff]
+        ]
+
+    def dispatch(self, incidents, time_of_day='morning', capacities=None):
+        # Assigns every incident to a medical facility minimizing the total
+        # ETA, with at most capacities[hospital] incidents per hospital
+        # (unlimited when not given). One emergency-mode search per hospital
+        # fills the incident x hospital matrix; each hospital is expanded
+        # into one column per slot and the Hungarian method solves it.
+        incidents = [str(i) for i in incidents]
+        capacities = {str(h): c for h, c in (capacities or {}).items()}
+        graph = self.path_finder._prepare_graph(time_of_day, True)
+        hospitals = [str(f['id']) for f in self.data.facilities if 'Medical' in f['type'] and str(f['id']) in graph]
+
+        trees = {}
+        matrix = []  # minutes, one row per incident, one column per hospital
+        for hospital in hospitals:
+            trees[hospital] = self.path_finder._dijkstra(graph, hospital)
+        for incident in incidents:
+            matrix.append(array('d', (trees[h][0].get(incident, math.inf) * 60 for h in hospitals)))
+
+        columns = []  # hospital position of every slot
+        for h, hospital in enumerate(hospitals):
+            columns.extend([h] * min(capacities.get(hospital, len(incidents)), len(incidents)))
+        columns.extend([None] * max(0, len(incidents) - len(columns)))  # nobody
+
+        costs = [
+            [row[h] if h is not None and row[h] < math.inf else UNREACHABLE for h in columns]
+            for row in matrix
+        ]
+        assignment = self._hungarian(costs)
+
+        dispatched = []
+        unassigned = []
+        load = {hospital: 0 for hospital in hospitals}
+        for incident, row, column in zip(incidents, matrix, assignment):
+            h = columns[column]
+            if h is None or row[h] == math.inf:
+                unassigned.append(incident)
+                continue
+            hospital = hospitals[h]
+            load[hospital] += 1
+
+            # The graph is undirected, so the hospital's tree gives the way
+            # back from the incident
+            previous = trees[hospital][1]
+            path = [incident]
+            while path[-1] != hospital:
+                path.append(previous[path[-1]])
+
+            result = self.path_finder._build_result(path, time_of_day, emergency=True)
+            result['incident'] = incident
+            result['hospital'] = hospital
+            result['hospital_name'] = self.data.get_location_name(hospital)
+            result['eta'] = row[h]
+            dispatched.append(result)
+
+        return {
+            'time_of_day': time_of_day,
+            'assignments': dispatched,
+            'unassigned': unassigned,
+            'total_eta': sum(r['eta'] for r in dispatched),
+            'hospital_load': [
+                {'hospital': hospital, 'assigned': load[hospital], 'capacity': capacities.get(hospital)}
+                for hospital in hospitals
+            ]
+        }
+
+    def _hungarian(self, costs):
+        # Minimum-cost assignment of n rows to distinct columns (n <= m),
+        # shortest augmenting paths with potentials in O(n^2 m). Returns the
+        # column of every row.
+        n = len(costs)
+        m = len(costs[0]) if costs else 0
+        u = [0.0] * (n + 1)
+        v = [0.0] * (m + 1)
+        owner = [0] * (m + 1)  # row (1-based) holding each column
+        way = [0] * (m + 1)
+
+        for i in range(1, n + 1):
+            owner[0] = i
+            j0 = 0
+            min_reduced = [math.inf] * (m + 1)
+            used = [False] * (m + 1)
+            while True:
+                used[j0] = True
+                i0 = owner[j0]
+                row = costs[i0 - 1]
+                delta = math.inf
+                j1 = 0
+                for j in range(1, m + 1):
+                    if not used[j]:
+                        reduced = row[j - 1] - u[i0] - v[j]
+                        if reduced < min_reduced[j]:
+                            min_reduced[j] = reduced
+                            way[j] = j0
+                        if min_reduced[j] < delta:
+                            delta = min_reduced[j]
+                            j1 = j
+                for j in range(m + 1):
+                    if used[j]:
+                        u[owner[j]] += delta
+                        v[j] -= delta
+                    else:
+                        min_reduced[j] -= delta
+                j0 = j1
+                if owner[j0] == 0:
+                    break
+            # Flip the augmenting path
+            while j0:
+                j1 = way[j0]
+                owner[j0] = owner[j1]
+                j0 = j1
+
+        assignment = [0] * n
+        for j in range(1, m + 1):
+            if owner[j]:
+                assignment[owner[j] - 1] = j - 1
+        return assignment
+
+    def get_coverage(self, time_of_day):
+        return self.data.get_slot_artifact('hospital_coverage', time_of_day, lambda: self._build_coverage(time_of_day))
+
+    def _build_coverage(self, time_of_day):
+        # One multi-source Dijkstra on the emergency graph, seeded with every
+        # medical facility at distance zero, labels each node with its nearest
+        # hospital, the ETA to it and the next hop on the way there
+        graph = self.path_finder._prepare_graph(time_of_day, True)
+        hospitals = [str(f['id']) for f in self.data.facilities if 'Medical' in f['type']]
+
+        distances = {}
+        nearest = {}
+        next_hop = {}
+        visited = set()
+        weights = graph.weights
+        priority_queue = []
+        for hospital in hospitals:
+            if hospital in graph:
+                distances[hospital] = 0
+                nearest[hospital] = hospital
+                next_hop[hospital] = None
+                heapq.heappush(priority_queue, (0, hospital))
+
+        while priority_queue:
+            current_distance, current_node = heapq.heappop(priority_queue)
+
+            if current_node in visited:
+                continue
+
+            visited.add(current_node)
+
+            for neighbor, road_index in graph[current_node].items():
+                distance = current_distance + weights[road_index]
+
+                if distance < distances.get(neighbor, float('inf')):
+                    distances[neighbor] = distance
+                    nearest[neighbor] = nearest[current_node]
+                    next_hop[neighbor] = current_node
+                    heapq.heappush(priority_queue, (distance, neighbor))
+
+        eta = {node: distance * 60 for node, distance in distances.items()}  # in minutes
+        order = sorted((minutes, node) for node, minutes in eta.items())
+        order_by_hospital = {hospital: [] for hospital in hospitals}
+        for minutes, node in order:
+            order_by_hospital[nearest[node]].append((minutes, node))
+
+        return {
+            'nearest': nearest,
+            'eta': eta,
+            'next_hop': next_hop,
+            'order': order,
+            'order_by_hospital': order_by_hospital
+        }
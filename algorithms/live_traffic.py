@@ -0,0 +1,135 @@
+from algorithms.shortest_path import ShortestPathFinder
+from algorithms.time_dependent import TimeDependentRouter
+from data.cairo_data import TIME_SLOTS
+from data.dependent_cache import road_key
+
+
+class LiveTrafficUpdater:
+    def __init__(self, cairo_data, route_tables=None):
+        self.data = cairo_data
+        # Shared {(time_of_day, emergency): RouteTable}; tables for a slot are
+        # dropped as soon as its traffic changes
+        self.route_tables = route_tables if route_tables is not None else {}
+        self.path_finder = ShortestPathFinder(cairo_data)
+        self.router = TimeDependentRouter(cairo_data)
+
+    def apply_updates(self, updates):
+        # updates: iterable of {'from', 'to', 'time_of_day', 'traffic'}. Only
+        # the edges of the changed roads are re-weighted in the compiled
+        # graphs, and only cached results depending on them are evicted.
+        stats = {
+            'applied': 0,
+            'reweighted_edges': 0,
+            'invalidated_routes': 0,
+            'invalidated_signal_plans': 0
+        }
+
+        # Coalesce repeated updates to the same road and slot, last one wins
+        latest = {}
+        for update in updates:
+            latest[(road_key(update['from'], update['to']), update['time_of_day'])] = update['traffic']
+
+        with self.data.update_lock:
+            changed_slots = set()
+            for ((from_id, to_id), time_of_day), traffic in latest.items():
+                previous = self.data.set_road_traffic(from_id, to_id, time_of_day, traffic)
+                stats['applied'] += 1
+                if previous == traffic:
+                    continue
+
+                changed_slots.add(time_of_day)
+                stats['reweighted_edges'] += self._reweight(
+                    self.data.get_road_indexes(from_id, to_id), [time_of_day]
+                )
+                stats['invalidated_signal_plans'] += self.data.signal_plan_cache.invalidate_roads(
+                    time_of_day, [road_key(from_id, to_id)]
+                )
+
+                if traffic > previous:
+                    # Slower road: only routes that use it can get worse
+                    stats['invalidated_routes'] += self.data.route_cache.invalidate_roads(
+                        time_of_day, [road_key(from_id, to_id)]
+                    )
+                else:
+                    # Faster road: any route in the slot might now use it
+                    stats['invalidated_routes'] += self.data.route_cache.invalidate_slot(time_of_day)
+
+            for time_of_day in changed_slots:
+                self.data.invalidate_slot_artifacts(time_of_day)
+                for emergency in (False, True):
+                    self.route_tables.pop((time_of_day, emergency), None)
+
+        return stats
+
+    def apply_closures(self, closures):
+        # closures: iterable of {'from', 'to', 'closed'}. Closed roads become
+        # impassable in every slot and mode; the connected components,
+        # bridges and articulation points are recomputed over the open roads.
+        stats = {
+            'applied': 0,
+            'changed_roads': 0,
+            'reweighted_edges': 0,
+            'invalidated_routes': 0,
+            'invalidated_signal_plans': 0
+        }
+
+        latest = {}
+        for closure in closures:
+            latest[road_key(closure['from'], closure['to'])] = closure['closed']
+
+        with self.data.update_lock:
+            changed = []
+            reopened = False
+            for (from_id, to_id), closed in latest.items():
+                road_indexes = self.data.set_road_closed(from_id, to_id, closed)
+                stats['applied'] += 1
+                if not road_indexes:
+                    continue
+
+                changed.extend(road_indexes)
+                reopened = reopened or not closed
+                for time_of_day in TIME_SLOTS:
+                    stats['invalidated_signal_plans'] += self.data.signal_plan_cache.invalidate_roads(
+                        time_of_day, [road_key(from_id, to_id)]
+                    )
+                    if closed:
+                        # Only routes over the closed road are affected
+                        stats['invalidated_routes'] += self.data.route_cache.invalidate_roads(
+                            time_of_day, [road_key(from_id, to_id)]
+                        )
+
+            if changed:
+                stats['changed_roads'] = len(changed)
+                stats['reweighted_edges'] = self._reweight(changed, TIME_SLOTS)
+                for time_of_day in TIME_SLOTS:
+                    if reopened:
+                        # A reopened road may shorten any route
+                        stats['invalidated_routes'] += self.data.route_cache.invalidate_slot(time_of_day)
+                    self.data.invalidate_slot_artifacts(time_of_day)
+                    for emergency in (False, True):
+                        self.route_tables.pop((time_of_day, emergency), None)
+
+        return stats
+
+    def _reweight(self, road_indexes, time_slots):
+        reweighted = 0
+
+        for emergency in (False, True):
+            for time_of_day in time_slots:
+                graph = self.data.compiled_graphs.get((time_of_day, emergency))
+                if graph is not None:
+                    for road_index in road_indexes:
+                        graph.weights[road_index] = self.path_finder._road_weight(road_index, time_of_day, emergency)
+                        reweighted += 1
+
+                    # Only the overlay cells containing these roads need new cliques
+                    overlay = self.data.compiled_graphs.get(('crp', time_of_day, emergency))
+                    if overlay is not None and overlay.graph is graph:
+                        overlay.update_roads(road_indexes)
+
+            # Anchor changes shift the interpolated profile of the road
+            for edge in road_indexes:
+                if self.router.refresh_edge(emergency, edge):
+                    reweighted += 1
+
+        return reweighted
@@ -1,157 +1,289 @@
-class MSTOptimizer:
-    def __init__(self, cairo_data):
-        self.data = cairo_data
-    
-    def optimize_network(self, use_prim=True, prioritize_population=True):
-        # Prepare graph data
-        graph = self._prepare_graph(prioritize_population)
-        
-        if use_prim:
-            return self._prim_mst(graph)
-        else:
-            return self._kruskal_mst(graph)
-    
-    def _prepare_graph(self, prioritize_population):
-        # Create a graph representation with weighted edges
-        graph = {'nodes': [], 'edges': []}
-        
-        # Add all locations as nodes
-        for loc in self.data.neighborhoods + self.data.facilities:
-            graph['nodes'].append({
-                'id': loc['id'],
-                'name': loc.get('name', ''),
-                'population': loc.get('population', 0),
-                'type': loc.get('type', ''),
-                'x': loc['x'],
-                'y': loc['y']
-            })
-        
-        # Add existing roads with weights based on condition and capacity
-        for road in self.data.existing_roads:
-            from_node = next(n for n in graph['nodes'] if n['id'] == road['from'])
-            to_node = next(n for n in graph['nodes'] if n['id'] == road['to'])
-            
-            # Weight calculation based on distance, condition, and capacity
-            weight = road['distance'] * (1 + (10 - road['condition'])/10)
-            
-            if prioritize_population:
-                pop_factor = (from_node['population'] + to_node['population']) / 1000000
-                weight = weight / (1 + pop_factor)
-            
-            graph['edges'].append({
-                'from': road['from'],
-                'to': road['to'],
-                'weight': weight,
-                'existing': True,
-                'distance': road['distance'],
-                'capacity': road['capacity'],
-                'condition': road['condition']
-            })
-        
-        # Add potential roads with weights considering construction cost
-        for road in self.data.potential_roads:
-            from_node = next(n for n in graph['nodes'] if n['id'] == road['from'])
-            to_node = next(n for n in graph['nodes'] if n['id'] == road['to'])
-            
-            weight = road['distance'] * (1 + road['cost']/1000)
-            
-            if prioritize_population:
-                pop_factor = (from_node['population'] + to_node['population']) / 1000000
-                weight = weight / (1 + pop_factor)
-            
-            graph['edges'].append({
-                'from': road['from'],
-                'to': road['to'],
-                'weight': weight,
-                'existing': False,
-                'distance': road['distance'],
-                'capacity': road['capacity'],
-                'cost': road['cost']
-            })
-        
-        return graph
-    
-    def _prim_mst(self, graph):
-        # Implementation of Prim's algorithm
-        nodes = graph['nodes']
-        edges = graph['edges']
-        
-        if not nodes:
-            return {'nodes': [], 'edges': []}
-        
-        mst_nodes = [nodes[0]['id']]
-        mst_edges = []
-        
-        while len(mst_nodes) < len(nodes):
-            candidate_edges = [
-                e for e in edges 
-                if (e['from'] in mst_nodes and e['to'] not in mst_nodes) or 
-                   (e['to'] in mst_nodes and e['from'] not in mst_nodes)
-            ]
-            
-            if not candidate_edges:
-                break  # Disconnected graph
-                
-            min_edge = min(candidate_edges, key=lambda x: x['weight'])
-            mst_edges.append(min_edge)
-            
-            if min_edge['from'] not in mst_nodes:
-                mst_nodes.append(min_edge['from'])
-            else:
-                mst_nodes.append(min_edge['to'])
-        
-        return {
-            'nodes': [n for n in nodes if n['id'] in mst_nodes],
-            'edges': mst_edges,
-            'total_distance': sum(e['distance'] for e in mst_edges),
-            'total_cost': sum(e.get('cost', 0) for e in mst_edges if not e['existing']),
-            'critical_facilities_connected': self._check_critical_facilities(mst_edges)
-        }
-    
-    def _kruskal_mst(self, graph):
-        # Implementation of Kruskal's algorithm
-        nodes = graph['nodes']
-        edges = sorted(graph['edges'], key=lambda x: x['weight'])
-        
-        parent = {n['id']: n['id'] for n in nodes}
-        
-        def find(u):
-            while parent[u] != u:
-                parent[u] = parent[parent[u]]
-                u = parent[u]
-            return u
-        
-        def union(u, v):
-            u_root = find(u)
-            v_root = find(v)
-            if u_root == v_root:
-                return False
-            parent[v_root] = u_root
-            return True
-        
-        mst_edges = []
-        for edge in edges:
-            if union(edge['from'], edge['to']):
-                mst_edges.append(edge)
-                if len(mst_edges) == len(nodes) - 1:
-                    break
-        
-        mst_nodes = list(set([e['from'] for e in mst_edges] + [e['to'] for e in mst_edges]))
-        
-        return {
-            'nodes': [n for n in nodes if n['id'] in mst_nodes],
-            'edges': mst_edges,
-            'total_distance': sum(e['distance'] for e in mst_edges),
-            'total_cost': sum(e.get('cost', 0) for e in mst_edges if not e['existing']),
-            'critical_facilities_connected': self._check_critical_facilities(mst_edges)
-        }
-    
-    def _check_critical_facilities(self, edges):
-        critical_facilities = ['F1', 'F2', 'F9', 'F10']  # Airport, Railway, Hospitals
-        connected_nodes = set()
-        
-        for edge in edges:
-            connected_nodes.add(edge['from'])
-            connected_nodes.add(edge['to'])
-        
-        return all(f in connected_nodes for f in critical_facilities)
\ No newline at end of file
+import heapq
+
+CRITICAL_FACILITIES = ['F1', 'F2', 'F9', 'F10']  # Airport, Railway, Hospitals
+
+
+class MSTOptimizer:
+    def __init__(self, cairo_data):
+        self.data = cairo_data
+    
+    def optimize_network(self, use_prim=True, prioritize_population=True):
+        # Prepare graph data
+        graph = self._prepare_graph(prioritize_population)
+        
+        if use_prim:
+            return self._prim_mst(graph)
+        else:
+            return self._kruskal_mst(graph)
+    
+    def _prepare_graph(self, prioritize_population):
+        # Edges are parallel lists over existing then potential roads, with
+        # endpoints as location table positions; the node and edge dicts of
+        # the result are only built for what ends up in the tree
+        locations = self.data.locations
+        population = locations.population
+        graph = {'node_count': len(locations), 'from': [], 'to': [], 'weight': [], 'source': []}
+        
+        # Add existing roads with weights based on condition and capacity
+        roads = self.data.roads
+        for i in range(len(roads)):
+            from_index = roads.from_index[i]
+            to_index = roads.to_index[i]
+            if from_index < 0 or to_index < 0:
+                continue
+            
+            # Weight calculation based on distance, condition, and capacity
+            weight = roads.distance[i] * (1 + (10 - roads.condition[i])/10)
+            
+            if prioritize_population:
+                pop_factor = (population[from_index] + population[to_index]) / 1000000
+                weight = weight / (1 + pop_factor)
+            
+            graph['from'].append(from_index)
+            graph['to'].append(to_index)
+            graph['weight'].append(weight)
+            graph['source'].append((True, i))
+        
+        # Add potential roads with weights considering construction cost
+        potential = self.data.potential
+        for i in range(len(potential)):
+            from_index = potential.from_index[i]
+            to_index = potential.to_index[i]
+            if from_index < 0 or to_index < 0:
+                continue
+            
+            weight = potential.distance[i] * (1 + potential.cost[i]/1000)
+            
+            if prioritize_population:
+                pop_factor = (population[from_index] + population[to_index]) / 1000000
+                weight = weight / (1 + pop_factor)
+            
+            graph['from'].append(from_index)
+            graph['to'].append(to_index)
+            graph['weight'].append(weight)
+            graph['source'].append((False, i))
+        
+        return graph
+    
+    def iter_network(self, use_prim=True, prioritize_population=True):
+        # Streaming form of optimize_network: every tree edge is yielded as
+        # soon as it is chosen, preceded by its endpoints not yet sent, and a
+        # summary record closes the stream. Node records carry the location
+        # type as location_type, since type names the record kind.
+        graph = self._prepare_graph(prioritize_population)
+        
+        def node_record(node):
+            record = self._node_record(node)
+            return {'type': 'node', 'location_type': record.pop('type'), **record}
+        
+        seen = set()
+        if use_prim and graph['node_count']:
+            seen.add(0)
+            yield node_record(0)
+        
+        edges = []
+        for e in (self._iter_prim(graph) if use_prim else self._iter_kruskal(graph)):
+            for node in (graph['from'][e], graph['to'][e]):
+                if node not in seen:
+                    seen.add(node)
+                    yield node_record(node)
+            edges.append(self._edge_record(graph, e))
+            yield {'type': 'edge', **edges[-1]}
+        
+        yield {'type': 'summary', **self._summary(edges)}
+    
+    def _prim_mst(self, graph):
+        if graph['node_count'] == 0:
+            return {'nodes': [], 'edges': []}
+        
+        mst_edges = list(self._iter_prim(graph))
+        mst_nodes = {0} | set(graph['from'][e] for e in mst_edges) | set(graph['to'][e] for e in mst_edges)
+        
+        return self._build_result(graph, mst_nodes, mst_edges)
+    
+    def _iter_prim(self, graph):
+        # Prim's algorithm with a binary heap from node 0, yielding tree
+        # edges as they are chosen; ties go to the earlier edge
+        n = graph['node_count']
+        edge_from = graph['from']
+        edge_to = graph['to']
+        weights = graph['weight']
+        
+        if n == 0:
+            return
+        
+        incident = [[] for _ in range(n)]
+        for e in range(len(weights)):
+            incident[edge_from[e]].append(e)
+            incident[edge_to[e]].append(e)
+        
+        in_tree = [False] * n
+        priority_queue = []
+        
+        def add_node(node):
+            in_tree[node] = True
+            for e in incident[node]:
+                if not in_tree[edge_from[e]] or not in_tree[edge_to[e]]:
+                    heapq.heappush(priority_queue, (weights[e], e))
+        
+        add_node(0)
+        tree_size = 1
+        while priority_queue and tree_size < n:
+            _, e = heapq.heappop(priority_queue)
+            if in_tree[edge_from[e]] and in_tree[edge_to[e]]:
+                continue
+            yield e
+            add_node(edge_to[e] if in_tree[edge_from[e]] else edge_from[e])
+            tree_size += 1
+    
+    def _kruskal_mst(self, graph):
+        mst_edges = list(self._iter_kruskal(graph))
+        mst_nodes = set(graph['from'][e] for e in mst_edges) | set(graph['to'][e] for e in mst_edges)
+        
+        return self._build_result(graph, mst_nodes, mst_edges)
+    
+    def _iter_kruskal(self, graph):
+        # Implementation of Kruskal's algorithm, yielding tree edges as they
+        # are chosen
+        n = graph['node_count']
+        edge_from = graph['from']
+        edge_to = graph['to']
+        weights = graph['weight']
+        order = sorted(range(len(weights)), key=weights.__getitem__)
+        
+        parent = list(range(n))
+        
+        def find(u):
+            while parent[u] != u:
+                parent[u] = parent[parent[u]]
+                u = parent[u]
+            return u
+        
+        def union(u, v):
+            u_root = find(u)
+            v_root = find(v)
+            if u_root == v_root:
+                return False
+            parent[v_root] = u_root
+            return True
+        
+        chosen = 0
+        for e in order:
+            if union(edge_from[e], edge_to[e]):
+                yield e
+                chosen += 1
+                if chosen == n - 1:
+                    break
+    
+    def _build_result(self, graph, mst_nodes, mst_edges):
+        edges = [self._edge_record(graph, e) for e in mst_edges]
+        
+        return {
+            'nodes': [self._node_record(i) for i in sorted(mst_nodes)],
+            'edges': edges,
+            **self._summary(edges)
+        }
+    
+    def _summary(self, edges):
+        return {
+            'total_distance': sum(e['distance'] for e in edges),
+            'total_cost': sum(e.get('cost', 0) for e in edges if not e['existing']),
+            'critical_facilities_connected': self._check_critical_facilities(edges)
+        }
+    
+    def _node_record(self, i):
+        locations = self.data.locations
+        return {
+            'id': locations.raw_ids[i],
+            'name': locations.names[i],
+            'population': locations.population[i],
+            'type': locations.types[i],
+            'x': locations.x[i],
+            'y': locations.y[i]
+        }
+    
+    def _edge_record(self, graph, e):
+        existing, i = graph['source'][e]
+        if existing:
+            road = self.data.existing_roads[i]
+            return {
+                'from': road['from'],
+                'to': road['to'],
+                'weight': graph['weight'][e],
+                'existing': True,
+                'distance': road['distance'],
+                'capacity': road['capacity'],
+                'condition': road['condition']
+            }
+        
+        road = self.data.potential_roads[i]
+        return {
+            'from': road['from'],
+            'to': road['to'],
+            'weight': graph['weight'][e],
+            'existing': False,
+            'distance': road['distance'],
+            'capacity': road['capacity'],
+            'cost': road['cost']
+        }
+    
+    def _check_critical_facilities(self, edges):
+        connected_nodes = set()
+        
+        for edge in edges:
+            connected_nodes.add(edge['from'])
+            connected_nodes.add(edge['to'])
+        
+        return all(f in connected_nodes for f in CRITICAL_FACILITIES)
+    
+    def single_points_of_failure(self, facilities=CRITICAL_FACILITIES):
+        # Per facility, every open road (bridge) and location (articulation
+        # point) whose loss alone would cut other locations off from it, with
+        # the locations and population cut off, worst first
+        connectivity = self.data.connectivity
+        locations = self.data.locations
+        
+        def cut_off(nodes):
+            return {
+                'cut_off': [locations.raw_ids[locations.index[node]] for node in nodes],
+                'cut_off_population': sum(locations.population[locations.index[node]] for node in nodes)
+            }
+        
+        report = []
+        for facility in facilities:
+            facility = str(facility)
+            if facility not in connectivity.component:
+                continue
+            roads, nodes = connectivity.single_points_of_failure(facility)
+            reachable = len(connectivity.members[connectivity.component[facility]]) - 1
+            report.append({
+                'facility': facility,
+                'name': self.data.get_location_name(facility),
+                'reachable_locations': reachable,
+                'unreachable_locations': len(connectivity.order) - 1 - reachable,
+                'bridges': [
+                    {
+                        'from': self.data.existing_roads[road_index]['from'],
+                        'to': self.data.existing_roads[road_index]['to'],
+                        **cut_off(cut)
+                    }
+                    for road_index, cut in roads
+                ],
+                'articulation_points': [
+                    {
+                        'id': locations.raw_ids[locations.index[node]],
+                        'name': self.data.get_location_name(node),
+                        **cut_off(cut)
+                    }
+                    for node, cut in nodes
+                ]
+            })
+        
+        return {
+            'components': len(connectivity.members),
+            'closed_roads': [
+                {'from': self.data.existing_roads[i]['from'], 'to': self.data.existing_roads[i]['to']}
+                for i in sorted(self.data.closed_roads)
+            ],
+            'facilities': report
+        }
\ No newline at end of file
@@ -0,0 +1,155 @@
+import math
+from array import array
+
+from algorithms.shortest_path import ShortestPathFinder
+
+ORDER_KEYS = ('benefit', 'benefit_per_cost')
+
+
+class PotentialRoadRanker:
+    def __init__(self, cairo_data):
+        self.data = cairo_data
+        self.path_finder = ShortestPathFinder(cairo_data)
+
+    def rank(self, time_of_day='morning', budget=None, order_by='benefit_per_cost'):
+        # Scores every potential road by the OD travel time it saves over
+        # transport_demand (passenger-hours per day) and the demand it newly
+        # connects, then builds a greedy construction sequence. One
+        # all-pairs matrix is computed up front; a candidate is scored
+        # against it in O(OD pairs) and committing one is an O(n^2) update.
+        matrix = self._all_pairs(time_of_day)
+        od_pairs = self._od_pairs()
+        candidates = self._candidates(time_of_day)
+
+        ranking = []
+        for candidate in candidates:
+            ranking.append({**candidate['record'], **self._score(matrix, od_pairs, candidate)})
+        ranking.sort(key=lambda r: self._order_key(r, order_by), reverse=True)
+
+        # Greedy build order: take the best remaining road that still fits
+        # the budget, apply it to the matrix, rescore the rest
+        sequence = []
+        remaining = list(candidates)
+        total_cost = 0
+        total_saved = 0.0
+        total_connected = 0
+        while remaining:
+            scored = []
+            for candidate in remaining:
+                if budget is not None and total_cost + candidate['cost'] > budget:
+                    continue
+                score = self._score(matrix, od_pairs, candidate)
+                if score['time_saved'] > 0 or score['connected_demand'] > 0:
+                    scored.append((self._order_key(score, order_by), candidate, score))
+            if not scored:
+                break
+
+            _, chosen, score = max(scored, key=lambda s: s[0])
+            self._apply(matrix, chosen)
+            remaining.remove(chosen)
+            total_cost += chosen['cost']
+            total_saved += score['time_saved']
+            total_connected += score['connected_demand']
+            sequence.append({
+                **chosen['record'],
+                **score,
+                'step': len(sequence) + 1,
+                'cumulative_cost': total_cost,
+                'cumulative_time_saved': total_saved,
+                'cumulative_connected_demand': total_connected
+            })
+
+        return {
+            'time_of_day': time_of_day,
+            'order_by': order_by,
+            'budget': budget,
+            'ranking': ranking,
+            'build_sequence': sequence
+        }
+
+    def _order_key(self, score, order_by):
+        # Connecting unserved demand outranks any time saving
+        if order_by == 'benefit':
+            return (score['connected_demand'], score['time_saved'])
+        return (score['connected_demand_per_cost'], score['benefit_per_cost'])
+
+    def _all_pairs(self, time_of_day):
+        # Travel time matrix in hours, one row per location table position
+        graph = self.path_finder._prepare_graph(time_of_day, False)
+        ids = self.data.locations.ids
+        matrix = []
+        for node in ids:
+            hours, _ = self.path_finder._dijkstra(graph, node)
+            matrix.append(array('d', (hours.get(other, math.inf) for other in ids)))
+        return matrix
+
+    def _od_pairs(self):
+        # [(origin index, destination index, passengers)] for known locations
+        index = self.data.locations.index
+        pairs = []
+        for d in self.data.transport_demand:
+            origin, destination = index.get(str(d['from'])), index.get(str(d['to']))
+            if origin is not None and destination is not None and origin != destination:
+                pairs.append((origin, destination, d['passengers']))
+        return pairs
+
+    def _candidates(self, time_of_day):
+        # New roads open in perfect condition; traffic is whatever the data
+        # reports for the pair (the default when nothing is recorded)
+        potential = self.data.potential
+        candidates = []
+        for i, road in enumerate(self.data.potential_roads):
+            u, v = potential.from_index[i], potential.to_index[i]
+            if u < 0 or v < 0 or u == v:
+                continue
+            traffic = self.data.get_road_traffic(road['from'], road['to'], time_of_day)
+            hours = self.path_finder._edge_weight({**road, 'condition': 10}, traffic, False)
+            candidates.append({
+                'u': u,
+                'v': v,
+                'hours': hours,
+                'cost': road['cost'],
+                'record': {
+                    'from': road['from'],
+                    'to': road['to'],
+                    'distance': road['distance'],
+                    'capacity': road['capacity'],
+                    'cost': road['cost'],
+                    'travel_time': hours * 60  # in minutes
+                }
+            })
+        return candidates
+
+    def _score(self, matrix, od_pairs, candidate):
+        u, v, w = candidate['u'], candidate['v'], candidate['hours']
+        row_u, row_v = matrix[u], matrix[v]
+        saved = 0.0
+        connected = 0
+        for origin, destination, passengers in od_pairs:
+            current = matrix[origin][destination]
+            via = min(matrix[origin][u] + w + row_v[destination], matrix[origin][v] + w + row_u[destination])
+            if via < current:
+                if current == math.inf:
+                    connected += passengers
+                else:
+                    saved += passengers * (current - via)
+
+        cost = candidate['cost'] if candidate['cost'] > 0 else 1
+        return {
+            'time_saved': saved,  # passenger-hours per day
+            'connected_demand': connected,  # passengers per day
+            'benefit_per_cost': saved / cost,
+            'connected_demand_per_cost': connected / cost
+        }
+
+    def _apply(self, matrix, candidate):
+        # d(i, j) = min(d(i, j), d(i, u) + w + d(v, j), d(i, v) + w + d(u, j))
+        u, v, w = candidate['u'], candidate['v'], candidate['hours']
+        row_u = array('d', matrix[u])
+        row_v = array('d', matrix[v])
+        for i, row in enumerate(matrix):
+            via_u = row_u[i] + w
+            via_v = row_v[i] + w
+            if via_u == math.inf and via_v == math.inf:
+                continue
+            matrix[i] = array('d', map(min, row, (via_u + d for d in row_v), (via_v + d for d in row_u)))
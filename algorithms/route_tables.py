@@ -0,0 +1,182 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+from array import array
+
+from algorithms.shortest_path import ShortestPathFinder
+from data.cairo_data import TIME_SLOTS, CairoData
+
+# File layout: magic, format version, header length, JSON header (node order,
+# time slot, mode, data version), padding to 8 bytes, then three n*n row-major
+# matrices: travel times in minutes (float64), road distances in km (float64)
+# and predecessor node indexes (int32, -1 for none).
+MAGIC = b'CRTT'
+FORMAT_VERSION = 1
+PREFIX = struct.Struct('<4sII')
+
+
+def table_filename(time_of_day, emergency):
+    return f"{time_of_day}-{'emergency' if emergency else 'regular'}.rtt"
+
+
+def compute_all_pairs(cairo_data, time_of_day, emergency):
+    # One full Dijkstra tree per source over the ShortestPathFinder graph
+    path_finder = ShortestPathFinder(cairo_data)
+    graph = path_finder._prepare_graph(time_of_day, emergency)
+    nodes = list(graph)
+    index = {node: i for i, node in enumerate(nodes)}
+    n = len(nodes)
+    road_km = cairo_data.roads.distance
+
+    times = array('d', [float('inf')]) * (n * n)
+    distances = array('d', [float('inf')]) * (n * n)
+    predecessors = array('i', [-1]) * (n * n)
+
+    for s, source in enumerate(nodes):
+        weights, previous = path_finder._dijkstra(graph, source)
+        row = s * n
+
+        # Road distance along the tree, filled in settle order so each
+        # predecessor is done before its children
+        km = {source: 0.0}
+        for node in sorted(weights, key=weights.get):
+            if weights[node] == float('inf'):
+                break
+            prev = previous[node]
+            if prev is not None:
+                km[node] = km[prev] + road_km[graph[prev][node]]
+                predecessors[row + index[node]] = index[prev]
+            times[row + index[node]] = weights[node] * 60  # in minutes
+            distances[row + index[node]] = km[node]
+
+    return nodes, times, distances, predecessors
+
+
+def write_table(path, header, times, distances, predecessors):
+    header_bytes = json.dumps(header).encode('utf-8')
+    padding = -(PREFIX.size + len(header_bytes)) % 8
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(PREFIX.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b'\0' * padding)
+        times.tofile(f)
+        distances.tofile(f)
+        predecessors.tofile(f)
+    os.replace(tmp_path, path)
+
+
+def build_route_tables(cairo_data, out_dir, time_slots=TIME_SLOTS):
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+
+    for time_of_day in time_slots:
+        for emergency in (False, True):
+            nodes, times, distances, predecessors = compute_all_pairs(cairo_data, time_of_day, emergency)
+            header = {
+                'data_version': cairo_data.get_data_version(),
+                'time_of_day': time_of_day,
+                'emergency': emergency,
+                'nodes': nodes
+            }
+            path = os.path.join(out_dir, table_filename(time_of_day, emergency))
+            write_table(path, header, times, distances, predecessors)
+            written.append(path)
+
+    return written
+
+
+class RouteTable:
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, header_len = PREFIX.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f'Unsupported route table format in {path}')
+
+        offset = PREFIX.size
+        self.header = json.loads(self._mmap[offset:offset + header_len].decode('utf-8'))
+        offset += header_len
+        offset += -offset % 8
+
+        self.nodes = self.header['nodes']
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+        n = len(self.nodes)
+
+        view = memoryview(self._mmap)
+        self.times = view[offset:offset + 8 * n * n].cast('d')
+        offset += 8 * n * n
+        self.distances = view[offset:offset + 8 * n * n].cast('d')
+        offset += 8 * n * n
+        self.predecessors = view[offset:offset + 4 * n * n].cast('i')
+
+    def has_node(self, node):
+        return node in self.index
+
+    def time(self, start, end):
+        n = len(self.nodes)
+        return self.times[self.index[start] * n + self.index[end]]
+
+    def distance(self, start, end):
+        n = len(self.nodes)
+        return self.distances[self.index[start] * n + self.index[end]]
+
+    def path(self, start, end):
+        # Walk the predecessor row of start back from end; [] if unreachable
+        n = len(self.nodes)
+        s = self.index[start]
+        t = self.index[end]
+        if self.times[s * n + t] == float('inf'):
+            return []
+
+        path = [t]
+        while path[-1] != s:
+            path.append(self.predecessors[s * n + path[-1]])
+        path.reverse()
+        return [self.nodes[i] for i in path]
+
+
+def load_route_tables(table_dir, data_version):
+    # Returns {(time_of_day, emergency): RouteTable} for every table built from
+    # the current data version; stale or unreadable tables are skipped
+    tables = {}
+    if not table_dir or not os.path.isdir(table_dir):
+        return tables
+
+    for time_of_day in TIME_SLOTS:
+        for emergency in (False, True):
+            path = os.path.join(table_dir, table_filename(time_of_day, emergency))
+            if not os.path.exists(path):
+                continue
+            try:
+                table = RouteTable(path)
+            except (OSError, ValueError) as e:
+                print(f"Skipping route table {path}: {e}")
+                continue
+            if table.header.get('data_version') != data_version:
+                print(f"Skipping stale route table {path}")
+                continue
+            tables[(time_of_day, emergency)] = table
+
+    return tables
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Precompute all-pairs route tables per time slot')
+    parser.add_argument('--out', default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'route_tables'),
+                        help='output directory (default: route_tables/ next to app.py)')
+    parser.add_argument('--time-of-day', action='append', choices=TIME_SLOTS,
+                        help='time slot to build, may be repeated (default: all)')
+    args = parser.parse_args()
+
+    cairo_data = CairoData()
+    for path in build_route_tables(cairo_data, args.out, args.time_of_day or TIME_SLOTS):
+        print(f"Wrote {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,182 +1,425 @@
-import heapq
-import math
-
-class ShortestPathFinder:
-    def __init__(self, cairo_data):
-        self.data = cairo_data
-    
-    def find_shortest_path(self, start, end, time_of_day='morning'):
-        return self._find_path(start, end, time_of_day, emergency=False)
-    
-    def emergency_route(self, start, end, time_of_day='morning'):
-        return self._find_path(start, end, time_of_day, emergency=True)
-    
-    def _find_path(self, start, end, time_of_day, emergency):
-        graph = self._prepare_graph(time_of_day, emergency)
-        
-        start = str(start)
-        end = str(end)
-        
-        if start not in graph or end not in graph:
-            return {'path': [], 'distance': 0, 'time': 0, 'error': 'Invalid start or end location'}
-        
-        # Dijkstra's algorithm with priority queue
-        distances = {node: float('inf') for node in graph}
-        distances[start] = 0
-        previous = {node: None for node in graph}
-        visited = set()
-        
-        priority_queue = [(0, start)]
-        
-        while priority_queue:
-            current_distance, current_node = heapq.heappop(priority_queue)
-            
-            if current_node in visited:
-                continue
-                
-            visited.add(current_node)
-            
-            if current_node == end:
-                break
-                
-            for neighbor, edge_data in graph[current_node].items():
-                distance = current_distance + edge_data['weight']
-                
-                if distance < distances[neighbor]:
-                    distances[neighbor] = distance
-                    previous[neighbor] = current_node
-                    heapq.heappush(priority_queue, (distance, neighbor))
-        
-        if distances[end] == float('inf'):
-            # Try again with relaxed constraints if no path found
-            if emergency:
-                return self._find_path(start, end, time_of_day, emergency=False)
-            return {'path': [], 'distance': 0, 'time': 0, 'error': 'No path found'}
-        
-        # Reconstruct path
-        path = []
-        current = end
-        while current is not None:
-            path.append(current)
-            current = previous.get(current)
-        path.reverse()
-        
-        # Calculate path details
-        path_details = self._get_path_details(path, time_of_day, emergency)
-        total_distance = path_details['total_distance']
-        total_time = sum(step['time'] for step in path_details['steps']) if path_details['steps'] else 0
-        
-        return {
-            'path': path,
-            'distance': total_distance,
-            'time': total_time,
-            'path_details': path_details
-        }
-    
-    def _prepare_graph(self, time_of_day, emergency):
-        graph = {}
-        
-        # Add all nodes
-        for loc in self.data.neighborhoods + self.data.facilities:
-            graph[str(loc['id'])] = {}
-        
-        # Add all edges
-        for road in self.data.existing_roads:
-            from_id = str(road['from'])
-            to_id = str(road['to'])
-            
-            if from_id not in graph or to_id not in graph:
-                continue
-                
-            traffic = self.data.get_road_traffic(from_id, to_id, time_of_day)
-            capacity = road['capacity']
-            congestion = min(traffic / capacity, 2.0)  # Cap congestion at 200%
-            
-            # Calculate speed
-            if emergency:
-                base_speed = 80  # km/h for emergency vehicles
-                congestion_factor = max(0.4, 1 - (congestion * 0.3))  # 40-100% of speed
-            else:
-                base_speed = 30  # km/h for regular traffic
-                congestion_factor = max(0.2, 1 - (congestion * 0.4))  # 20-100% of speed
-            
-            speed = base_speed * congestion_factor
-            
-            # Road condition penalty (1-10, 10 is best)
-            condition_factor = 1 + ((10 - road['condition']) * 0.05)  # 1.0-1.45 multiplier
-            
-            # Calculate weight (time in hours)
-            weight = (road['distance'] / speed) * condition_factor if speed > 0 else float('inf')
-            
-            # Add edge in both directions
-            graph[from_id][to_id] = {
-                'weight': weight,
-                'distance': road['distance'],
-                'traffic': traffic,
-                'capacity': capacity,
-                'condition': road['condition']
-            }
-            graph[to_id][from_id] = {
-                'weight': weight,
-                'distance': road['distance'],
-                'traffic': traffic,
-                'capacity': capacity,
-                'condition': road['condition']
-            }
-        
-        return graph
-    
-    def _get_location_coords(self, loc_id):
-        loc = self.data.get_neighborhood(loc_id) or self.data.get_facility(loc_id)
-        if loc:
-            return {'x': loc['x'], 'y': loc['y']}
-        return None
-    
-    def _get_path_details(self, path, time_of_day, emergency=False):
-        details = []
-        total_distance = 0
-        valid_steps = 0
-
-        for i in range(len(path) - 1):
-            from_id = path[i]
-            to_id = path[i+1]
-            
-            road = self.data.get_road_between(from_id, to_id)
-            if not road:
-                continue
-                
-            distance = road['distance']
-            total_distance += distance
-            
-            traffic = self.data.get_road_traffic(from_id, to_id, time_of_day)
-            capacity = road['capacity']
-            congestion = min(traffic / capacity, 2.0)  # Cap at 200% congestion
-            
-            # Calculate time
-            if emergency:
-                speed = 80 * max(0.4, 1 - (congestion * 0.3))  # 40-100% of speed
-            else:
-                speed = 30 * max(0.2, 1 - (congestion * 0.4))  # 20-100% of speed
-            
-            condition_factor = 1 + ((10 - road['condition']) * 0.05)
-            time = (distance / speed) * condition_factor * 60  # in minutes
-            
-            details.append({
-                'from': from_id,
-                'to': to_id,
-                'from_name': self.data.get_location_name(from_id),
-                'to_name': self.data.get_location_name(to_id),
-                'distance': distance,
-                'condition': road['condition'],
-                'traffic': traffic,
-                'capacity': capacity,
-                'congestion': congestion,
-                'time': time
-            })
-            valid_steps += 1
-
-        return {
-            'steps': details,
-            'total_distance': total_distance,
-            'average_congestion': sum(d['congestion'] for d in details) / valid_steps if valid_steps > 0 else 0
+import heapq
+import math
+from array import array
+
+from algorithms.crp import Overlay, Partition
+from data.cairo_data import TIME_SLOTS
+from data.dependent_cache import road_key
+
+# Query engines: plain Dijkstra on the compiled graph, or the multi-level
+# overlay (customizable route planning) built on top of it
+ENGINES = ('dijkstra', 'crp')
+
+
+class RoutingGraph:
+    # Per-(slot, mode) routing graph: the road topology is shared with the
+    # data object and only the travel times (hours, by existing_roads index)
+    # are stored per graph. graph[node] maps each neighbor to its road index.
+    __slots__ = ('adjacency', 'weights')
+
+    def __init__(self, adjacency, weights):
+        self.adjacency = adjacency
+        self.weights = weights
+
+    def __contains__(self, node):
+        return node in self.adjacency
+
+    def __iter__(self):
+        return iter(self.adjacency)
+
+    def __len__(self):
+        return len(self.adjacency)
+
+    def __getitem__(self, node):
+        return self.adjacency[node]
+
+    def weight(self, a, b):
+        return self.weights[self.adjacency[a][b]]
+
+
+class ShortestPathFinder:
+    def __init__(self, cairo_data, route_tables=None, engine='dijkstra'):
+        self.data = cairo_data
+        # Optional {(time_of_day, emergency): RouteTable} of precomputed
+        # all-pairs tables matching the current data version
+        self.route_tables = route_tables or {}
+        self.engine = engine
+    
+    def find_shortest_path(self, start, end, time_of_day='morning'):
+        return self._find_path(start, end, time_of_day, emergency=False)
+    
+    def emergency_route(self, start, end, time_of_day='morning'):
+        return self._find_path(start, end, time_of_day, emergency=True)
+    
+    def iter_routes_batch(self, queries):
+        # Queries sharing an origin, time slot and mode are answered from one
+        # full search tree, so each group costs a single Dijkstra run. Results
+        # are yielded in input order; a tree is dropped after its last use.
+        queries = [
+            (str(q['start']), str(q['end']), q.get('time_of_day', 'morning'), bool(q.get('emergency', False)))
+            for q in queries
+        ]
+        
+        remaining = {}
+        for start, end, time_of_day, emergency in queries:
+            key = (start, time_of_day, emergency)
+            remaining[key] = remaining.get(key, 0) + 1
+        
+        graphs = {}
+        trees = {}
+        
+        def get_tree(start, time_of_day, emergency):
+            key = (start, time_of_day, emergency)
+            if key not in trees:
+                if (time_of_day, emergency) not in graphs:
+                    graphs[(time_of_day, emergency)] = self._prepare_graph(time_of_day, emergency)
+                graph = graphs[(time_of_day, emergency)]
+                trees[key] = self._dijkstra(graph, start) if start in graph else None
+            return trees[key]
+        
+        for start, end, time_of_day, emergency in queries:
+            key = (start, time_of_day, emergency)
+            
+            table_result = self._find_path_in_tables(start, end, time_of_day, emergency)
+            if table_result is not None:
+                remaining[key] -= 1
+                yield table_result
+                continue
+            
+            if start not in self.data.road_adjacency or end not in self.data.road_adjacency:
+                result = {'path': [], 'distance': 0, 'time': 0, 'error': 'Invalid start or end location'}
+            elif not self.data.connectivity.connected(start, end):
+                result = {'path': [], 'distance': 0, 'time': 0, 'error': 'No path found'}
+            else:
+                _, previous = get_tree(start, time_of_day, emergency)
+                path = self._reconstruct_path(previous, end)
+                result = self._build_result(path, time_of_day, emergency)
+            
+            remaining[key] -= 1
+            if remaining[key] == 0:
+                trees.pop(key, None)
+            
+            yield result
+    
+    def _find_path(self, start, end, time_of_day, emergency):
+        start = str(start)
+        end = str(end)
+        
+        table_result = self._find_path_in_tables(start, end, time_of_day, emergency)
+        if table_result is not None:
+            return table_result
+        
+        if start not in self.data.road_adjacency or end not in self.data.road_adjacency:
+            return {'path': [], 'distance': 0, 'time': 0, 'error': 'Invalid start or end location'}
+        
+        # Unreachable pairs are rejected from the connected components
+        # without searching; both modes share the same open roads, so no
+        # relaxed retry could find a path either
+        if not self.data.connectivity.connected(start, end):
+            return {'path': [], 'distance': 0, 'time': 0, 'error': 'No path found'}
+        
+        # Cached routes are evicted by live traffic updates on their roads
+        cache_key = (start, end, time_of_day, emergency)
+        cached = self.data.route_cache.get(cache_key)
+        if cached is not None:
+            return dict(cached)
+        
+        graph = self._prepare_graph(time_of_day, emergency)
+        
+        if self.engine == 'crp':
+            path, _ = self._get_overlay(time_of_day, emergency).query(start, end)
+        else:
+            _, previous = self._dijkstra(graph, start, end)
+            path = self._reconstruct_path(previous, end)
+        
+        result = self._build_result(path, time_of_day, emergency)
+        
+        roads = [road_key(a, b) for a, b in zip(result['path'], result['path'][1:])]
+        self.data.route_cache.put(cache_key, result, time_of_day, roads)
+        return dict(result)
+    
+    def find_alternative_routes(self, start, end, time_of_day='morning', emergency=False, k=3):
+        # Yen's k shortest loopless paths with Lawler's refinement: a new path
+        # is only spurred from its deviation node onward, since earlier spur
+        # nodes were already expanded for its parent. Spur searches are A*
+        # guided by the reverse shortest-path tree from end, and skipped
+        # entirely when the tree path from the spur node is still usable.
+        graph = self._prepare_graph(time_of_day, emergency)
+        start = str(start)
+        end = str(end)
+        
+        if start not in graph or end not in graph or k < 1:
+            return []
+        
+        # Undirected graph: the tree from end gives every node's distance to
+        # end and its next hop towards it
+        to_end, next_hop = self._dijkstra(graph, end)
+        if to_end[start] == float('inf'):
+            return []
+        
+        def tree_path(node):
+            path = [node]
+            while path[-1] != end:
+                path.append(next_hop[path[-1]])
+            return path
+        
+        shortest = tree_path(start)
+        found = [(to_end[start], shortest)]
+        candidates = []
+        seen = {tuple(shortest)}
+        deviation = {tuple(shortest): 0}
+        
+        while len(found) < k:
+            _, last_path = found[-1]
+            root_cost = 0
+            for i in range(len(last_path) - 1):
+                spur_node = last_path[i]
+                root = last_path[:i + 1]
+                if i > 0:
+                    root_cost += graph.weight(last_path[i - 1], spur_node)
+                if i < deviation[tuple(last_path)]:
+                    continue
+                
+                blocked_edges = set()
+                for _, path in found:
+                    if len(path) > i and path[:i + 1] == root:
+                        blocked_edges.add((path[i], path[i + 1]))
+                blocked_nodes = set(root[:-1])
+                
+                spur = self._spur_path(graph, spur_node, end, to_end, tree_path, blocked_nodes, blocked_edges)
+                if spur is None:
+                    continue
+                
+                spur_path, spur_cost = spur
+                candidate = root + spur_path[1:]
+                if tuple(candidate) in seen:
+                    continue
+                seen.add(tuple(candidate))
+                deviation[tuple(candidate)] = i
+                heapq.heappush(candidates, (root_cost + spur_cost, candidate))
+            
+            if not candidates:
+                break
+            found.append(heapq.heappop(candidates))
+        
+        return [self._build_result(path, time_of_day, emergency) for _, path in found]
+    
+    def _spur_path(self, graph, source, end, to_end, tree_path, blocked_nodes, blocked_edges):
+        # Reuse the reverse tree path when it avoids everything blocked
+        path = tree_path(source)
+        if not blocked_nodes.intersection(path) and \
+                not any((a, b) in blocked_edges for a, b in zip(path, path[1:])):
+            return path, to_end[source]
+        
+        # Otherwise A* with the unblocked distance to end as the heuristic,
+        # which stays admissible because blocking only lengthens paths
+        best = {source: 0}
+        previous = {source: None}
+        visited = set()
+        priority_queue = [(to_end[source], source)]
+        
+        while priority_queue:
+            _, current_node = heapq.heappop(priority_queue)
+            if current_node in visited:
+                continue
+            visited.add(current_node)
+            
+            if current_node == end:
+                return self._reconstruct_path(previous, end), best[end]
+            
+            weights = graph.weights
+            for neighbor, road_index in graph[current_node].items():
+                if neighbor in blocked_nodes or (current_node, neighbor) in blocked_edges:
+                    continue
+                distance = best[current_node] + weights[road_index]
+                if distance < best.get(neighbor, float('inf')):
+                    best[neighbor] = distance
+                    previous[neighbor] = current_node
+                    heapq.heappush(priority_queue, (distance + to_end[neighbor], neighbor))
+        
+        return None
+    
+    def _find_path_in_tables(self, start, end, time_of_day, emergency):
+        # Answer from a precomputed all-pairs table if one covers this query;
+        # None means no table applies and a live search is needed
+        table = self.route_tables.get((time_of_day, emergency))
+        if table is None or not table.has_node(start) or not table.has_node(end):
+            return None
+        
+        path = table.path(start, end)
+        if not path:
+            # Both modes share the same topology, so no relaxed retry can help
+            return {'path': [], 'distance': 0, 'time': 0, 'error': 'No path found'}
+        
+        return self._build_result(path, time_of_day, emergency)
+    
+    def _dijkstra(self, graph, start, end=None):
+        # Dijkstra's algorithm with priority queue; without an end node the
+        # whole shortest-path tree from start is settled
+        distances = {node: float('inf') for node in graph}
+        distances[start] = 0
+        previous = {node: None for node in graph}
+        visited = set()
+        weights = graph.weights
+        
+        priority_queue = [(0, start)]
+        
+        while priority_queue:
+            current_distance, current_node = heapq.heappop(priority_queue)
+            
+            if current_node in visited:
+                continue
+                
+            visited.add(current_node)
+            
+            if current_node == end:
+                break
+                
+            for neighbor, road_index in graph[current_node].items():
+                distance = current_distance + weights[road_index]
+                
+                if distance < distances[neighbor]:
+                    distances[neighbor] = distance
+                    previous[neighbor] = current_node
+                    heapq.heappush(priority_queue, (distance, neighbor))
+        
+        return distances, previous
+    
+    def _reconstruct_path(self, previous, end):
+        path = []
+        current = end
+        while current is not None:
+            path.append(current)
+            current = previous.get(current)
+        path.reverse()
+        return path
+    
+    def _build_result(self, path, time_of_day, emergency):
+        # Calculate path details
+        path_details = self._get_path_details(path, time_of_day, emergency)
+        total_distance = path_details['total_distance']
+        total_time = sum(step['time'] for step in path_details['steps']) if path_details['steps'] else 0
+        
+        return {
+            'path': path,
+            'distance': total_distance,
+            'time': total_time,
+            'path_details': path_details
+        }
+    
+    def _prepare_graph(self, time_of_day, emergency):
+        # Compiled graphs are shared across requests through the data object
+        # and kept for the lifetime of the data, so only known slots get one
+        if time_of_day not in TIME_SLOTS:
+            raise ValueError(f"Unknown time_of_day: {time_of_day!r}")
+        return self.data.get_compiled_graph(
+            (time_of_day, emergency),
+            lambda: self._graph_from_edge_weights(self._compute_edge_weights(time_of_day, emergency))
+        )
+    
+    def _get_overlay(self, time_of_day, emergency):
+        # The partition depends on the topology only and is built once per
+        # data load; each compiled graph gets its own customized overlay,
+        # rebuilt if the graph itself was replaced
+        partition = self.data.get_compiled_graph(('crp_partition',), lambda: Partition(self.data))
+        graph = self._prepare_graph(time_of_day, emergency)
+        key = ('crp', time_of_day, emergency)
+        overlay = self.data.get_compiled_graph(key, lambda: Overlay(partition, graph))
+        if overlay.graph is not graph:
+            overlay = Overlay(partition, graph)
+            self.data.compiled_graphs[key] = overlay
+        return overlay
+    
+    def _compute_edge_weights(self, time_of_day, emergency):
+        # Per-road travel time (hours), aligned with existing_roads
+        return array('d', (
+            self._road_weight(i, time_of_day, emergency) for i in range(len(self.data.existing_roads))
+        ))
+    
+    def _road_weight(self, road_index, time_of_day, emergency, traffic=None):
+        # Travel time of one road under the given traffic, by default its
+        # current traffic in the slot; closed roads are impassable
+        if road_index in self.data.closed_roads:
+            return float('inf')
+        road = self.data.existing_roads[road_index]
+        if traffic is None:
+            traffic = self.data.get_road_traffic(road['from'], road['to'], time_of_day)
+        return self._edge_weight(road, traffic, emergency)
+    
+    def _edge_weight(self, road, traffic, emergency):
+        capacity = road['capacity']
+        congestion = min(traffic / capacity, 2.0)  # Cap congestion at 200%
+        
+        # Calculate speed
+        if emergency:
+            base_speed = 80  # km/h for emergency vehicles
+            congestion_factor = max(0.4, 1 - (congestion * 0.3))  # 40-100% of speed
+        else:
+            base_speed = 30  # km/h for regular traffic
+            congestion_factor = max(0.2, 1 - (congestion * 0.4))  # 20-100% of speed
+        
+        speed = base_speed * congestion_factor
+        
+        # Road condition penalty (1-10, 10 is best)
+        condition_factor = 1 + ((10 - road['condition']) * 0.05)  # 1.0-1.45 multiplier
+        
+        # Calculate weight (time in hours)
+        return (road['distance'] / speed) * condition_factor if speed > 0 else float('inf')
+    
+    def _graph_from_edge_weights(self, weights):
+        return RoutingGraph(self.data.road_adjacency, weights)
+    
+    def _get_location_coords(self, loc_id):
+        loc = self.data.get_neighborhood(loc_id) or self.data.get_facility(loc_id)
+        if loc:
+            return {'x': loc['x'], 'y': loc['y']}
+        return None
+    
+    def _get_path_details(self, path, time_of_day, emergency=False):
+        details = []
+        total_distance = 0
+        valid_steps = 0
+
+        for i in range(len(path) - 1):
+            from_id = path[i]
+            to_id = path[i+1]
+            
+            road = self.data.get_road_between(from_id, to_id)
+            if not road:
+                continue
+                
+            distance = road['distance']
+            total_distance += distance
+            
+            traffic = self.data.get_road_traffic(from_id, to_id, time_of_day)
+            capacity = road['capacity']
+            congestion = min(traffic / capacity, 2.0)  # Cap at 200% congestion
+            
+            # Calculate time
+            if emergency:
+                speed = 80 * max(0.4, 1 - (congestion * 0.3))  # 40-100% of speed
+            else:
+                speed = 30 * max(0.2, 1 - (congestion * 0.4))  # 20-100% of speed
+            
+            condition_factor = 1 + ((10 - road['condition']) * 0.05)
+            time = (distance / speed) * condition_factor * 60  # in minutes
+            
+            details.append({
+                'from': from_id,
+                'to': to_id,
+                'from_name': self.data.get_location_name(from_id),
+                'to_name': self.data.get_location_name(to_id),
+                'distance': distance,
+                'condition': road['condition'],
+                'traffic': traffic,
+                'capacity': capacity,
+                'congestion': congestion,
+                'time': time
+            })
+            valid_steps += 1
+
+        return {
+            'steps': details,
+            'total_distance': total_distance,
+            'average_congestion': sum(d['congestion'] for d in details) / valid_steps if valid_steps > 0 else 0
         }
\ No newline at end of file
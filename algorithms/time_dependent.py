@@ -0,0 +1,196 @@
+import bisect
+import heapq
+from array import array
+from datetime import datetime, timedelta, timezone
+
+from algorithms.shortest_path import ShortestPathFinder
+
+try:
+    from zoneinfo import ZoneInfo
+    CAIRO_TZ = ZoneInfo('Africa/Cairo')
+except Exception:
+    CAIRO_TZ = timezone(timedelta(hours=2))
+
+MINUTES_PER_DAY = 24 * 60
+
+# Minute of day at which each traffic bucket is observed; traffic between
+# anchors is interpolated linearly, wrapping around midnight
+SLOT_ANCHORS = {
+    'night': 2 * 60,
+    'morning': 8 * 60,
+    'afternoon': 14 * 60,
+    'evening': 18 * 60
+}
+
+# Travel time profiles are sampled every PROFILE_STEP minutes, giving each edge
+# a piecewise-linear travel time function of departure time
+PROFILE_STEP = 30
+PROFILE_SAMPLES = MINUTES_PER_DAY // PROFILE_STEP
+
+_ANCHORS = sorted((minute, slot) for slot, minute in SLOT_ANCHORS.items())
+_ANCHOR_MINUTES = [minute for minute, _ in _ANCHORS]
+
+
+def parse_departure(value):
+    # Accepts a unix timestamp, an ISO 8601 datetime or 'HH:MM'; returns an
+    # aware datetime in Cairo local time
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, tz=CAIRO_TZ)
+
+    value = str(value).strip()
+    if len(value) <= 5 and ':' in value:
+        hours, minutes = value.split(':')
+        today = datetime.now(CAIRO_TZ)
+        return today.replace(hour=int(hours), minute=int(minutes), second=0, microsecond=0)
+
+    departure = datetime.fromisoformat(value)
+    if departure.tzinfo is None:
+        return departure.replace(tzinfo=CAIRO_TZ)
+    return departure.astimezone(CAIRO_TZ)
+
+
+def interpolate_traffic(traffic_by_slot, minute):
+    # Linear interpolation between the slot anchors around the clock
+    anchors = [(m, traffic_by_slot[slot]) for m, slot in _ANCHORS]
+    i = bisect.bisect_right(_ANCHOR_MINUTES, minute)
+    m0, t0 = anchors[i - 1] if i > 0 else (anchors[-1][0] - MINUTES_PER_DAY, anchors[-1][1])
+    m1, t1 = anchors[i] if i < len(anchors) else (anchors[0][0] + MINUTES_PER_DAY, anchors[0][1])
+    return t0 + (t1 - t0) * (minute - m0) / (m1 - m0)
+
+
+class TimeDependentRouter:
+    def __init__(self, cairo_data):
+        self.data = cairo_data
+        self.path_finder = ShortestPathFinder(cairo_data)
+
+    def route(self, start, end, departure, emergency=False):
+        profile = self._get_profile(emergency)
+        start = str(start)
+        end = str(end)
+
+        if start not in profile['adjacency'] or end not in profile['adjacency']:
+            return {'path': [], 'distance': 0, 'time': 0, 'error': 'Invalid start or end location'}
+
+        if not self.data.connectivity.connected(start, end):
+            return {'path': [], 'distance': 0, 'time': 0, 'error': 'No path found'}
+
+        departure = parse_departure(departure)
+        depart_minute = departure.hour * 60 + departure.minute + departure.second / 60
+
+        arrival, previous = self._dijkstra(profile, start, end, depart_minute)
+        if arrival.get(end) is None:
+            return {'path': [], 'distance': 0, 'time': 0, 'error': 'No path found'}
+
+        path = self.path_finder._reconstruct_path(previous, end)
+
+        # Reuse the static step details, replacing times and traffic with the
+        # values at the moment each road is entered
+        path_details = self.path_finder._get_path_details(path, 'morning', emergency)
+        for step in path_details['steps']:
+            entered = arrival[step['from']]
+            edge = profile['adjacency'][step['from']][step['to']]
+            step['time'] = self._interpolate(profile['times'], edge, entered)
+            step['traffic'] = self._interpolate(profile['traffic'], edge, entered)
+            step['congestion'] = min(step['traffic'] / step['capacity'], 2.0)
+            step['depart_at'] = (departure + timedelta(minutes=entered - depart_minute)).isoformat()
+        if path_details['steps']:
+            path_details['average_congestion'] = sum(d['congestion'] for d in path_details['steps']) / len(path_details['steps'])
+
+        total_time = arrival[end] - depart_minute
+        return {
+            'path': path,
+            'distance': path_details['total_distance'],
+            'time': total_time,
+            'departure_time': departure.isoformat(),
+            'arrival_time': (departure + timedelta(minutes=total_time)).isoformat(),
+            'path_details': path_details
+        }
+
+    def _dijkstra(self, profile, start, end, depart_minute):
+        # Time-dependent Dijkstra: labels are arrival times, and each edge is
+        # evaluated at the time it is entered. FIFO profiles keep this exact.
+        adjacency = profile['adjacency']
+        times = profile['times']
+        arrival = {start: depart_minute}
+        previous = {start: None}
+        visited = set()
+        priority_queue = [(depart_minute, start)]
+
+        while priority_queue:
+            current_time, current_node = heapq.heappop(priority_queue)
+
+            if current_node in visited:
+                continue
+
+            visited.add(current_node)
+
+            if current_node == end:
+                break
+
+            for neighbor, edge in adjacency[current_node].items():
+                arrive = current_time + self._interpolate(times, edge, current_time)
+                if arrive < arrival.get(neighbor, float('inf')):
+                    arrival[neighbor] = arrive
+                    previous[neighbor] = current_node
+                    heapq.heappush(priority_queue, (arrive, neighbor))
+
+        return arrival, previous
+
+    def _interpolate(self, values, edge, minute):
+        # Piecewise-linear interpolation of an edge profile at a departure time
+        position = (minute % MINUTES_PER_DAY) / PROFILE_STEP
+        i = int(position)
+        fraction = position - i
+        base = edge * PROFILE_SAMPLES
+        v0 = values[base + i % PROFILE_SAMPLES]
+        v1 = values[base + (i + 1) % PROFILE_SAMPLES]
+        return v0 + (v1 - v0) * fraction
+
+    def _get_profile(self, emergency):
+        return self.data.get_compiled_graph(('time_dependent', emergency), lambda: self._build_profile(emergency))
+
+    def _build_profile(self, emergency):
+        # Per-edge travel time (minutes) and traffic samples, stored flat as
+        # PROFILE_SAMPLES consecutive values per road in existing_roads order;
+        # the topology is the shared road adjacency
+        times = array('d')
+        traffic_samples = array('d')
+
+        for edge in range(len(self.data.existing_roads)):
+            travel, samples = self._edge_profile(edge, emergency)
+            times.extend(travel)
+            traffic_samples.extend(samples)
+
+        return {'adjacency': self.data.road_adjacency, 'times': times, 'traffic': traffic_samples}
+
+    def refresh_edge(self, emergency, edge):
+        # Recompute one road's samples in place after its traffic changed or
+        # it was closed or reopened
+        key = ('time_dependent', emergency)
+        profile = self.data.compiled_graphs.get(key)
+        if profile is None:
+            return False
+
+        travel, samples = self._edge_profile(edge, emergency)
+        base = edge * PROFILE_SAMPLES
+        profile['times'][base:base + PROFILE_SAMPLES] = array('d', travel)
+        profile['traffic'][base:base + PROFILE_SAMPLES] = array('d', samples)
+        return True
+
+    def _edge_profile(self, edge, emergency):
+        road = self.data.existing_roads[edge]
+        traffic_by_slot = {
+            slot: self.data.get_road_traffic(road['from'], road['to'], slot) for slot in SLOT_ANCHORS
+        }
+        samples = [interpolate_traffic(traffic_by_slot, i * PROFILE_STEP) for i in range(PROFILE_SAMPLES)]
+        if edge in self.data.closed_roads:
+            return [float('inf')] * PROFILE_SAMPLES, samples
+        travel = [self.path_finder._edge_weight(road, traffic, emergency) * 60 for traffic in samples]
+
+        # Enforce FIFO: leaving later never gets you there earlier, since
+        # a vehicle could always wait. Two passes cover the wrap-around.
+        for _ in range(2):
+            for i in range(PROFILE_SAMPLES - 1, -1, -1):
+                travel[i] = min(travel[i], PROFILE_STEP + travel[(i + 1) % PROFILE_SAMPLES])
+
+        return travel, samples
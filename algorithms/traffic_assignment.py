@@ -0,0 +1,153 @@
+import math
+from array import array
+
+from algorithms.shortest_path import RoutingGraph, ShortestPathFinder
+from data.cairo_data import TIME_SLOTS
+
+# Daily OD passengers become hourly vehicle demand: a peak hour carries
+# PEAK_HOUR_SHARE of the day's trips, other slots are scaled by how their
+# observed network traffic compares with the busiest slot
+PEAK_HOUR_SHARE = 0.1
+VEHICLE_OCCUPANCY = 1.5  # passengers per vehicle
+
+MAX_ITERATIONS = 50
+TOLERANCE = 1e-4  # relative duality gap
+LINE_SEARCH_STEPS = 30
+
+
+class TrafficAssignment:
+    def __init__(self, cairo_data):
+        self.data = cairo_data
+        self.path_finder = ShortestPathFinder(cairo_data)
+
+    def assign(self, time_of_day='morning', max_iterations=MAX_ITERATIONS, tolerance=TOLERANCE):
+        # User equilibrium by Frank-Wolfe: alternate an all-or-nothing load
+        # of the demand on current shortest paths with a line search along
+        # the direction towards it, minimizing the Beckmann objective. Link
+        # travel times follow the same congestion model as the routing graphs.
+        roads = self.data.existing_roads
+        road_count = len(roads)
+        demand, unassigned = self._slot_demand(time_of_day)
+
+        flows = self._all_or_nothing(self._link_times([0.0] * road_count), demand)
+        iterations = 0
+        gap = math.inf
+
+        while iterations < max_iterations:
+            times = self._link_times(flows)
+            target = self._all_or_nothing(times, demand)
+
+            # Relative gap between current and shortest-path system cost
+            current_cost = math.fsum(t * x for t, x in zip(times, flows) if x)
+            shortest_cost = math.fsum(t * y for t, y in zip(times, target) if y)
+            gap = (current_cost - shortest_cost) / current_cost if current_cost > 0 else 0.0
+            if gap <= tolerance:
+                break
+
+            direction = [y - x for x, y in zip(flows, target)]
+            step = self._line_search(flows, direction)
+            flows = [x + step * d for x, d in zip(flows, direction)]
+            iterations += 1
+
+        times = self._link_times(flows)
+        return {
+            'time_of_day': time_of_day,
+            'iterations': iterations,
+            'relative_gap': gap,
+            'assigned_demand': math.fsum(sum(targets.values()) for targets in demand.values()),
+            'unassigned_demand': unassigned,
+            'roads': [
+                {
+                    'from': road['from'],
+                    'to': road['to'],
+                    'flow': flows[i],
+                    'capacity': road['capacity'],
+                    'volume_capacity_ratio': flows[i] / road['capacity'] if road['capacity'] else 0,
+                    'observed_traffic': self.data.get_road_traffic(road['from'], road['to'], time_of_day),
+                    'travel_time': times[i] * 60 if times[i] < math.inf else None  # in minutes, None when closed
+                }
+                for i, road in enumerate(roads)
+            ]
+        }
+
+    def get_assignment(self, time_of_day):
+        # Default-parameter results are shared through the slot artifacts
+        return self.data.get_slot_artifact('traffic_assignment', time_of_day, lambda: self.assign(time_of_day))
+
+    def _slot_demand(self, time_of_day):
+        # {origin: {destination: vehicles per hour}} plus the demand that
+        # cannot be placed on the network (unknown or disconnected endpoints)
+        totals = {
+            slot: sum(t.get(slot, 0) for t in self.data.traffic_patterns) for slot in TIME_SLOTS
+        }
+        busiest = max(totals.values()) or 1
+        share = PEAK_HOUR_SHARE * totals.get(time_of_day, busiest) / busiest
+
+        demand = {}
+        unassigned = 0.0
+        for d in self.data.transport_demand:
+            origin, destination = str(d['from']), str(d['to'])
+            vehicles = d['passengers'] * share / VEHICLE_OCCUPANCY
+            if origin == destination:
+                continue
+            if origin not in self.data.road_adjacency or destination not in self.data.road_adjacency:
+                unassigned += vehicles
+                continue
+            targets = demand.setdefault(origin, {})
+            targets[destination] = targets.get(destination, 0.0) + vehicles
+
+        # Drop pairs no open road path connects, once, so every iteration
+        # loads the same total
+        for origin in list(demand):
+            for destination in list(demand[origin]):
+                if not self.data.connectivity.connected(origin, destination):
+                    unassigned += demand[origin].pop(destination)
+            if not demand[origin]:
+                del demand[origin]
+
+        return demand, unassigned
+
+    def _link_times(self, flows):
+        # Travel time (hours) of every road at the given flows; closed roads
+        # are impassable and so never carry flow
+        return array('d', (
+            self.path_finder._road_weight(i, None, False, traffic=flow) for i, flow in enumerate(flows)
+        ))
+
+    def _all_or_nothing(self, times, demand):
+        # One shortest-path tree per origin serves all of its destinations:
+        # demand is pushed from every node to its tree parent, deepest first
+        graph = RoutingGraph(self.data.road_adjacency, times)
+        flows = [0.0] * len(times)
+
+        for origin, targets in demand.items():
+            distances, previous = self.path_finder._dijkstra(graph, origin)
+            load = dict(targets)
+            reached = [node for node, distance in distances.items() if distance < math.inf]
+            for node in sorted(reached, key=distances.get, reverse=True):
+                parent = previous[node]
+                if parent is None or not load.get(node):
+                    continue
+                flows[graph[parent][node]] += load[node]
+                load[parent] = load.get(parent, 0.0) + load[node]
+
+        return flows
+
+    def _line_search(self, flows, direction):
+        # Bisection on the derivative of the Beckmann objective along the
+        # direction, sum(t(x + a * d) * d), which is non-decreasing in a
+        low, high = 0.0, 1.0
+        if self._objective_slope(flows, direction, high) <= 0:
+            return high
+
+        for _ in range(LINE_SEARCH_STEPS):
+            middle = (low + high) / 2
+            if self._objective_slope(flows, direction, middle) > 0:
+                high = middle
+            else:
+                low = middle
+        return (low + high) / 2
+
+    def _objective_slope(self, flows, direction, step):
+        times = self._link_times([x + step * d for x, d in zip(flows, direction)])
+        return math.fsum(t * d for t, d in zip(times, direction) if d)
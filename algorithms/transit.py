@@ -0,0 +1,254 @@
+import math
+from array import array
+
+from algorithms.shortest_path import RoutingGraph, ShortestPathFinder
+
+# Lines carry no timetable, so service is frequency based: a rider waits half
+# a headway on average. Bus headways follow from the fleet and the round trip
+# time on the roads; metro lines have no fleet size and use a fixed headway.
+METRO_HEADWAY = 6  # minutes
+METRO_SPEED = 35  # km/h between stations, straight line
+BUS_SPEED_FACTOR = 0.8  # buses are slower than cars on the same roads
+DWELL_TIME = 1  # minutes per intermediate stop
+WALK_SPEED = 5  # km/h along roads
+MAX_WALK_MINUTES = 60
+TRANSFER_MODES = ('walk', 'road')
+
+
+class TransitRouter:
+    def __init__(self, cairo_data):
+        self.data = cairo_data
+        self.path_finder = ShortestPathFinder(cairo_data)
+
+    def plan(self, start, end, time_of_day='morning', max_transfers=3, transfer_mode='walk'):
+        # Round-based (RAPTOR) search: round k holds the earliest arrival at
+        # every stop using at most k rides. Each round scans only the routes
+        # serving stops improved in the previous round, then relaxes
+        # transfers from stops reached by riding. The result is the Pareto
+        # set of journeys, i.e. each extra ride is only kept if it is faster.
+        start = str(start)
+        end = str(end)
+        network = self.get_network(time_of_day)
+        routes = network['routes']
+        transfers = self.get_transfers(time_of_day, transfer_mode)
+
+        # Round 0: reach everything directly from the start
+        access = self._leg_times(start, time_of_day, transfer_mode)
+        best = {}
+        rides = [{}]
+        labels = [{}]
+        for node, minutes in access.items():
+            labels[0][node] = (minutes, ('leg', start))
+            best[node] = minutes
+        marked = set(node for node in labels[0] if node in network['routes_by_stop'])
+
+        for k in range(1, max_transfers + 2):
+            if not marked:
+                break
+
+            # Earliest position per route at which a marked stop is served
+            queue = {}
+            for stop in marked:
+                for route_index, position in network['routes_by_stop'][stop]:
+                    queue[route_index] = min(queue.get(route_index, position), position)
+
+            ride_labels = {}
+            for route_index, first in queue.items():
+                route = routes[route_index]
+                stops = route['stops']
+                riding = None  # (minutes at current stop, boarding stop)
+
+                for position in range(first, len(stops)):
+                    stop = stops[position]
+                    if riding is not None and riding[0] < min(best.get(stop, math.inf), best.get(end, math.inf)):
+                        ride_labels[stop] = (riding[0], ('ride', route_index, riding[1]))
+                        best[stop] = riding[0]
+
+                    # Hop on here if waiting for this line beats staying on
+                    boarding = self._arrival_before(labels, k, stop)
+                    if boarding is not None:
+                        depart = boarding + route['headway'] / 2
+                        if riding is None or depart < riding[0]:
+                            riding = (depart, stop)
+
+                    if riding is not None and position + 1 < len(stops):
+                        riding = (riding[0] + route['segments'][position], riding[1])
+
+            labels.append(dict(ride_labels))
+            rides.append(ride_labels)
+
+            # Transfers only start from stops reached by riding in this round
+            for stop, (minutes, _) in ride_labels.items():
+                for node, walk in transfers.get(stop, {}).items():
+                    arrival = minutes + walk
+                    if arrival < min(best.get(node, math.inf), best.get(end, math.inf)):
+                        labels[k][node] = (arrival, ('transfer', stop))
+                        best[node] = arrival
+
+            marked = set(node for node in labels[k] if node in network['routes_by_stop'])
+
+        journeys = []
+        fastest = math.inf
+        for k in range(len(labels)):
+            label = labels[k].get(end)
+            if label is not None and label[0] < fastest:
+                fastest = label[0]
+                legs = self._reconstruct(labels, rides, k, end, network, time_of_day, transfer_mode)
+                journeys.append({
+                    'rides': k,
+                    'transfers': max(0, k - 1),
+                    'time': label[0],
+                    'legs': legs
+                })
+        return journeys
+
+    def get_network(self, time_of_day):
+        return self.data.get_slot_artifact('transit_network', time_of_day, lambda: self._build_network(time_of_day))
+
+    def get_transfers(self, time_of_day, transfer_mode):
+        # {stop: {node: minutes}} for every node reachable from a stop by a
+        # walking or road leg
+        return self.data.get_slot_artifact(
+            f'transit_transfers_{transfer_mode}', time_of_day,
+            lambda: {
+                stop: self._leg_times(stop, time_of_day, transfer_mode)
+                for stop in self.get_network(time_of_day)['routes_by_stop']
+            }
+        )
+
+    def _build_network(self, time_of_day):
+        # Every line becomes two directed routes with per-segment ride times
+        # (minutes, including the dwell at the next stop) and a headway
+        road_graph = self.path_finder._prepare_graph(time_of_day, False)
+        routes = []
+
+        for line in self.data.metro_lines:
+            stops = [str(s) for s in line['stations'] if self.data.location_exists(s)]
+            segments = [
+                self._straight_km(a, b) / METRO_SPEED * 60 + DWELL_TIME
+                for a, b in zip(stops, stops[1:])
+            ]
+            routes.extend(self._directed_routes(line['id'], line['name'], 'metro', stops, segments, METRO_HEADWAY))
+
+        for bus in self.data.bus_routes:
+            stops = [str(s) for s in bus['stops'] if self.data.location_exists(s)]
+            segments = []
+            for a, b in zip(stops, stops[1:]):
+                hours, _ = self.path_finder._dijkstra(road_graph, a, b)
+                segments.append(hours[b] * 60 / BUS_SPEED_FACTOR + DWELL_TIME)
+            round_trip = 2 * sum(segments)
+            headway = round_trip / bus['buses'] if bus['buses'] > 0 else math.inf
+            routes.extend(self._directed_routes(bus['id'], f"Bus {bus['id']}", 'bus', stops, segments, headway))
+
+        routes_by_stop = {}
+        for route_index, route in enumerate(routes):
+            for position, stop in enumerate(route['stops']):
+                routes_by_stop.setdefault(stop, []).append((route_index, position))
+
+        return {'routes': routes, 'routes_by_stop': routes_by_stop}
+
+    def _directed_routes(self, line_id, name, mode, stops, segments, headway):
+        if len(stops) < 2:
+            return []
+        route = {'line_id': line_id, 'name': name, 'mode': mode, 'headway': headway}
+        return [
+            {**route, 'stops': stops, 'segments': segments},
+            {**route, 'stops': stops[::-1], 'segments': segments[::-1]}
+        ]
+
+    def _arrival_before(self, labels, k, stop):
+        # Earliest arrival at stop using fewer than k rides
+        for j in range(k - 1, -1, -1):
+            label = labels[j].get(stop)
+            if label is not None:
+                return label[0]
+        return None
+
+    def _leg_graph(self, time_of_day, transfer_mode):
+        if transfer_mode == 'road':
+            return self.path_finder._prepare_graph(time_of_day, False)
+        # Walking ignores traffic but not closures, so the graph is kept with
+        # the slot artifacts, which closures drop
+        closed = self.data.closed_roads
+        return self.data.get_slot_artifact(
+            'transit_walking', time_of_day,
+            lambda: RoutingGraph(self.data.road_adjacency, array('d', (
+                math.inf if i in closed else km / WALK_SPEED for i, km in enumerate(self.data.roads.distance)
+            )))
+        )
+
+    def _leg_times(self, source, time_of_day, transfer_mode):
+        # Minutes from source to every node reachable by one leg
+        graph = self._leg_graph(time_of_day, transfer_mode)
+        if source not in graph:
+            return {}
+        hours, _ = self.path_finder._dijkstra(graph, source)
+        limit = MAX_WALK_MINUTES if transfer_mode == 'walk' else math.inf
+        return {node: h * 60 for node, h in hours.items() if h < math.inf and h * 60 <= limit}
+
+    def _straight_km(self, a, b):
+        index = self.data.locations.index
+        x = self.data.locations.x
+        y = self.data.locations.y
+        spatial_index = self.data.spatial_index
+        ax, ay = spatial_index.project(x[index[a]], y[index[a]])
+        bx, by = spatial_index.project(x[index[b]], y[index[b]])
+        return math.hypot(bx - ax, by - ay)
+
+    def _reconstruct(self, labels, rides, k, node, network, time_of_day, transfer_mode):
+        # Walk the labels back from the destination, one ride per round
+        legs = []
+        while True:
+            minutes, parent = labels[k][node]
+            if parent[0] == 'transfer':
+                stop = parent[1]
+                legs.append(self._leg(stop, node, minutes - rides[k][stop][0], time_of_day, transfer_mode))
+                node = stop
+                minutes, parent = rides[k][node]
+
+            if parent[0] == 'leg':
+                if node != parent[1]:
+                    legs.append(self._leg(parent[1], node, minutes, time_of_day, transfer_mode))
+                break
+
+            _, route_index, board = parent
+            route = network['routes'][route_index]
+            stops = route['stops']
+            i, j = stops.index(board), stops.index(node)
+            boarding = self._arrival_before(labels, k, board)
+            legs.append({
+                'mode': route['mode'],
+                'line_id': route['line_id'],
+                'line_name': route['name'],
+                'from': board,
+                'to': node,
+                'from_name': self.data.get_location_name(board),
+                'to_name': self.data.get_location_name(node),
+                'stops': stops[i:j + 1],
+                'wait': route['headway'] / 2,
+                'time': sum(route['segments'][i:j]),
+                'departure': boarding + route['headway'] / 2,
+                'arrival': minutes
+            })
+
+            # Continue from the label the ride boarded from
+            k -= 1
+            node = board
+            while board not in labels[k]:
+                k -= 1
+
+        legs.reverse()
+        return legs
+
+    def _leg(self, a, b, minutes, time_of_day, transfer_mode):
+        graph = self._leg_graph(time_of_day, transfer_mode)
+        _, previous = self.path_finder._dijkstra(graph, a, b)
+        return {
+            'mode': transfer_mode,
+            'from': a,
+            'to': b,
+            'from_name': self.data.get_location_name(a),
+            'to_name': self.data.get_location_name(b),
+            'path': self.path_finder._reconstruct_path(previous, b),
+            'time': minutes
+        }
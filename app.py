@@ -1,154 +1,939 @@
-from flask import Flask, render_template, jsonify, request
-from data.cairo_data import CairoData
-from algorithms.shortest_path import ShortestPathFinder
-from algorithms.mst import MSTOptimizer
-from algorithms.dynamic_prog import PublicTransportOptimizer
-from algorithms.greedy import TrafficSignalOptimizer
-
-app = Flask(__name__)
-
-# Initialize data
-cairo_data = CairoData()
-cairo_data.load_data()
-
-@app.route('/')
-def index():
-    return render_template('index.html')
-
-@app.route('/api/road_network', methods=['GET'])
-def get_road_network():
-    try:
-        return jsonify({
-            'neighborhoods': cairo_data.neighborhoods,
-            'facilities': cairo_data.facilities,
-            'existing_roads': cairo_data.existing_roads,
-            'potential_roads': cairo_data.potential_roads
-        })
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
-@app.route('/api/shortest_path', methods=['POST'])
-def find_shortest_path():
-    try:
-        data = request.get_json()
-        if not data:
-            return jsonify({'error': 'No data provided'}), 400
-            
-        start = data.get('start')
-        end = data.get('end')
-        time_of_day = data.get('time_of_day', 'morning')
-        
-        # Validate inputs
-        if not start or not end:
-            return jsonify({'error': 'Missing start or end location'}), 400
-        
-        if str(start) == str(end):
-            return jsonify({'error': 'Start and end locations cannot be the same'}), 400
-        
-        # Check if locations exist
-        if not cairo_data.location_exists(start):
-            return jsonify({'error': f'Start location ID {start} not found'}), 404
-        
-        if not cairo_data.location_exists(end):
-            return jsonify({'error': f'End location ID {end} not found'}), 404
-        
-        path_finder = ShortestPathFinder(cairo_data)
-        result = path_finder.find_shortest_path(str(start), str(end), time_of_day)
-        
-        return jsonify(result)
-        
-    except Exception as e:
-        return jsonify({'error': f'Failed to calculate path: {str(e)}'}), 500
-
-@app.route('/api/optimize_network', methods=['POST'])
-def optimize_network():
-    try:
-        data = request.get_json()
-        if not data:
-            return jsonify({'error': 'No data provided'}), 400
-            
-        optimizer = MSTOptimizer(cairo_data)
-        result = optimizer.optimize_network(
-            use_prim=data.get('algorithm', 'prim') == 'prim',
-            prioritize_population=data.get('prioritize_population', True)
-        )
-        return jsonify(result)
-        
-    except Exception as e:
-        return jsonify({'error': f'Network optimization failed: {str(e)}'}), 500
-
-@app.route('/api/optimize_transport', methods=['POST'])
-def optimize_transport():
-    try:
-        optimizer = PublicTransportOptimizer(cairo_data)
-        result = optimizer.optimize_schedules()
-        return jsonify(result)
-    except Exception as e:
-        return jsonify({'error': f'Transport optimization failed: {str(e)}'}), 500
-
-@app.route('/api/optimize_signals', methods=['POST'])
-def optimize_signals():
-    try:
-        data = request.get_json()
-        if not data:
-            return jsonify({'error': 'No data provided'}), 400
-            
-        optimizer = TrafficSignalOptimizer(cairo_data)
-        result = optimizer.optimize_signals(
-            intersections=data.get('intersections', []),
-            time_of_day=data.get('time_of_day', 'morning')
-        )
-        return jsonify(result)
-    except Exception as e:
-        return jsonify({'error': f'Signal optimization failed: {str(e)}'}), 500
-@app.route('/api/emergency_route', methods=['POST'])
-def find_emergency_route():
-    try:
-        data = request.get_json()
-        if not data:
-            return jsonify({'error': 'No data provided'}), 400
-            
-        start = data.get('start')
-        end = data.get('end')
-        time_of_day = data.get('time_of_day', 'morning')
-        
-        # Validate inputs
-        if not start or not end:
-            return jsonify({'error': 'Missing start or end location'}), 400
-        
-        if str(start) == str(end):
-            return jsonify({'error': 'Start and end locations cannot be the same'}), 400
-        
-        # Check if locations exist
-        if not cairo_data.location_exists(start):
-            return jsonify({'error': f'Start location ID {start} not found'}), 404
-        
-        if not cairo_data.location_exists(end):
-            return jsonify({'error': f'End location ID {end} not found'}), 404
-        
-        # Verify end is a medical facility
-        end_facility = cairo_data.get_facility(end)
-        if not end_facility or 'Medical' not in end_facility['type']:
-            return jsonify({'error': 'Destination must be a medical facility'}), 400
-        
-        path_finder = ShortestPathFinder(cairo_data)
-        result = path_finder.emergency_route(str(start), str(end), time_of_day)
-        
-        # Validate path coordinates
-        if result.get('path'):
-            path_coords = []
-            for loc_id in result['path']:
-                loc = cairo_data.get_neighborhood(loc_id) or cairo_data.get_facility(loc_id)
-                if loc:
-                    path_coords.append({'lat': loc['y'], 'lng': loc['x']})
-            result['path_coords'] = path_coords
-        
-        return jsonify(result)
-        
-    except Exception as e:
-        return jsonify({'error': f'Failed to calculate emergency route: {str(e)}'}), 500
-        
-    except Exception as e:
-        return jsonify({'error': f'Failed to calculate emergency route: {str(e)}'}), 500
-if __name__ == '__main__':
+import functools
+import hmac
+import json
+import os
+import time
+from flask import Flask, Response, g, render_template, jsonify, request, stream_with_context
+from data.precompute import precompute
+from data.result_cache import ResultCache, code_version
+from data.tiles import MAX_ZOOM, get_zoom_tiles
+from algorithms.shortest_path import ENGINES, ShortestPathFinder
+from algorithms.mst import CRITICAL_FACILITIES, MSTOptimizer
+from algorithms.dynamic_prog import PublicTransportOptimizer
+from algorithms.greedy import TrafficSignalOptimizer
+from algorithms.route_tables import load_route_tables
+from algorithms.time_dependent import TimeDependentRouter
+from algorithms.live_traffic import LiveTrafficUpdater
+from algorithms.hospital_coverage import HospitalCoverage
+from algorithms.transit import TRANSFER_MODES, TransitRouter
+from algorithms.traffic_assignment import MAX_ITERATIONS, TOLERANCE, TrafficAssignment
+from algorithms.potential_roads import ORDER_KEYS, PotentialRoadRanker
+from data.cairo_data import TIME_SLOTS, CairoData
+from profiler import SamplingProfiler, TracingProfiler
+
+app = Flask(__name__)
+
+# Initialize data
+cairo_data = CairoData()
+
+# Precomputed all-pairs tables (python -m algorithms.route_tables); only
+# tables built from the current data version are used
+ROUTE_TABLES_DIR = os.environ.get('ROUTE_TABLES_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'route_tables'))
+route_tables = load_route_tables(ROUTE_TABLES_DIR, cairo_data.get_data_version())
+
+# Build every per-slot artifact up front, PRECOMPUTE_WORKERS processes at a
+# time (default: one per core; 1 runs in-process, 0 skips precomputation)
+PRECOMPUTE_WORKERS = int(os.environ.get('PRECOMPUTE_WORKERS', os.cpu_count() or 1))
+if PRECOMPUTE_WORKERS > 0:
+    precompute(cairo_data, PRECOMPUTE_WORKERS)
+
+MAX_BATCH_QUERIES = 1000
+MAX_TRAFFIC_UPDATES = 10000
+MAX_ALTERNATIVES = 5
+MAX_TRANSIT_TRANSFERS = 5
+MAX_ASSIGNMENT_ITERATIONS = 500
+MAX_FLEET_SIZE = 100000
+MAX_DISPATCH_INCIDENTS = 100
+
+traffic_updater = LiveTrafficUpdater(cairo_data, route_tables)
+
+# Response bodies of the POST endpoints, shared by every worker process
+# through a SQLite file and keyed by the data and code versions, so workers
+# running the same code on the same data serve each other's results. An empty
+# RESULT_CACHE_PATH disables it; a request sent with Cache-Control: no-cache
+# bypasses it.
+RESULT_CACHE_PATH = os.environ.get('RESULT_CACHE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'result_cache', 'results.sqlite3'))
+RESULT_CACHE_MAX_ENTRIES = int(os.environ.get('RESULT_CACHE_MAX_ENTRIES', 10000))
+result_cache = ResultCache(
+    RESULT_CACHE_PATH, RESULT_CACHE_MAX_ENTRIES, code_version(os.path.dirname(os.path.abspath(__file__)))
+) if RESULT_CACHE_PATH else None
+
+# Opt-in request profiling: ?profile=1 (or X-Profile: 1) samples the handler,
+# ?profile=trace traces every call for exact timings. Callers must send
+# X-Profile-Token matching PROFILE_TOKEN when it is set, otherwise come from
+# one of PROFILE_ALLOWED_IPS; with neither configured profiling is off.
+# Collapsed stacks are written to PROFILE_DIR, keeping the newest
+# PROFILE_MAX_FILES.
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles'))
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+PROFILE_ALLOWED_IPS = {ip.strip() for ip in os.environ.get('PROFILE_ALLOWED_IPS', '').split(',') if ip.strip()}
+PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES', 200))
+
+def _resolve_location(value):
+    # GPS points given as {'lat': ..., 'lng': ...} snap to the nearest
+    # location with roads through the spatial index; IDs pass through unchanged
+    if isinstance(value, dict) and 'lat' in value and 'lng' in value:
+        nearest = cairo_data.spatial_index.nearest_points(
+            float(value['lng']), float(value['lat']), 1,
+            accept=lambda row: bool(cairo_data.road_adjacency[cairo_data.locations.ids[row]])
+        )
+        return cairo_data.locations.ids[nearest[0][1]] if nearest else None
+    return value
+
+def _route_query_error(start, end, emergency=False):
+    # Returns (message, status) for an invalid route query, None otherwise
+    if not start or not end:
+        return 'Missing start or end location', 400
+    
+    if str(start) == str(end):
+        return 'Start and end locations cannot be the same', 400
+    
+    # Check if locations exist
+    if not cairo_data.location_exists(start):
+        return f'Start location ID {start} not found', 404
+    
+    if not cairo_data.location_exists(end):
+        return f'End location ID {end} not found', 404
+    
+    if emergency:
+        # Verify end is a medical facility
+        end_facility = cairo_data.get_facility(end)
+        if not end_facility or 'Medical' not in end_facility['type']:
+            return 'Destination must be a medical facility', 400
+    
+    return None
+
+def _time_of_day_error(time_of_day):
+    # Per-slot graphs and artifacts are cached, so only known slots may
+    # reach the algorithms
+    if time_of_day not in TIME_SLOTS:
+        return f"time_of_day must be one of {', '.join(TIME_SLOTS)}"
+    return None
+
+def _time_dependent_route(start, end, departure_time, emergency):
+    # Route along continuous traffic profiles; None if the timestamp is invalid
+    try:
+        return TimeDependentRouter(cairo_data).route(start, end, departure_time, emergency)
+    except (ValueError, TypeError, OverflowError, OSError):
+        return None
+
+def _add_alternatives(result, start, end, time_of_day, emergency, count):
+    # Attach up to count alternatives to the fastest route, each with the
+    # same path/distance/time/path_details structure
+    if not count or not result.get('path'):
+        return result
+    
+    path_finder = ShortestPathFinder(cairo_data, route_tables)
+    routes = path_finder.find_alternative_routes(start, end, time_of_day, emergency, k=count + 1)
+    alternatives = [r for r in routes if r['path'] != result['path']][:count]
+    if emergency:
+        for alternative in alternatives:
+            _add_path_coords(alternative)
+    result['alternatives'] = alternatives
+    return result
+
+def _alternatives_count(data):
+    # Returns the requested number of alternatives, or None if invalid
+    count = data.get('alternatives', 0)
+    if not isinstance(count, int) or isinstance(count, bool) or count < 0 or count > MAX_ALTERNATIVES:
+        return None
+    return count
+
+def _wants_stream():
+    # NDJSON streaming is opt-in via ?stream=1 or an Accept header; profiled
+    # requests are never streamed so the profile covers the whole response
+    if 'profiler' in g:
+        return False
+    if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return 'application/x-ndjson' in request.headers.get('Accept', '')
+
+def _ndjson_response(records):
+    # One JSON document per line, written as each record is produced. Errors
+    # raised mid-stream are reported as a final error line since the status
+    # code has already been sent.
+    def generate():
+        try:
+            for record in records:
+                yield json.dumps(record) + '\n'
+        except Exception as e:
+            yield json.dumps({'type': 'error', 'error': str(e)}) + '\n'
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def _shared_cache(view):
+    # Serves a POST endpoint from the shared result cache. Streamed,
+    # profiled and no-cache requests bypass it, as do departure_time routes,
+    # whose answers depend on the current date; only successful JSON
+    # responses are stored. Traffic updates change the data version, and
+    # so the keys.
+    @functools.wraps(view)
+    def cached_view(*args, **kwargs):
+        payload = request.get_json(silent=True)
+        if result_cache is None or payload is None or 'profiler' in g or _wants_stream() \
+                or 'no-cache' in request.headers.get('Cache-Control', '') \
+                or (isinstance(payload, dict) and payload.get('departure_time') is not None):
+            return view(*args, **kwargs)
+        
+        data_version = cairo_data.get_data_version()
+        body = result_cache.get(request.path, payload, data_version)
+        if body is not None:
+            response = Response(body, mimetype='application/json')
+            response.headers['X-Cache'] = 'hit'
+            return response
+        
+        response = app.make_response(view(*args, **kwargs))
+        # Results computed while the data changed are not stored
+        if response.status_code == 200 and response.is_json and not response.is_streamed \
+                and cairo_data.get_data_version() == data_version:
+            result_cache.put(request.path, payload, data_version, response.get_data(as_text=True))
+        response.headers['X-Cache'] = 'miss'
+        return response
+    return cached_view
+
+def _add_path_coords(result):
+    # Validate path coordinates
+    if result.get('path'):
+        path_coords = []
+        for loc_id in result['path']:
+            loc = cairo_data.get_neighborhood(loc_id) or cairo_data.get_facility(loc_id)
+            if loc:
+                path_coords.append({'lat': loc['y'], 'lng': loc['x']})
+        result['path_coords'] = path_coords
+    return result
+
+def _profile_mode():
+    # None, 'sample' or 'trace'
+    value = (request.args.get('profile') or request.headers.get('X-Profile') or '').lower()
+    if value == 'trace':
+        return 'trace'
+    if value in ('1', 'true', 'yes', 'sample'):
+        return 'sample'
+    return None
+
+def _profile_allowed():
+    if PROFILE_TOKEN:
+        return hmac.compare_digest(request.headers.get('X-Profile-Token', ''), PROFILE_TOKEN)
+    return request.remote_addr in PROFILE_ALLOWED_IPS
+
+@app.before_request
+def _start_profiler():
+    mode = _profile_mode()
+    if mode is None:
+        return None
+    if not _profile_allowed():
+        return jsonify({'error': 'Profiling is not allowed for this caller'}), 403
+    g.profiler = TracingProfiler() if mode == 'trace' else SamplingProfiler()
+    g.profiler.start()
+
+@app.after_request
+def _finish_profiler(response):
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return response
+    profiler.stop()
+
+    filename = f"{time.strftime('%Y%m%dT%H%M%S')}-{request.endpoint or 'unknown'}-{os.getpid()}-{id(profiler):x}.folded"
+    try:
+        profiler.write_collapsed(os.path.join(PROFILE_DIR, filename), PROFILE_MAX_FILES)
+    except OSError as e:
+        print(f"Could not write profile {filename}: {e}")
+        filename = None
+
+    response.headers['X-Profile-Total'] = f"{profiler.total} {profiler.unit}"
+    response.headers['X-Profile-Duration-Ms'] = f"{profiler.duration * 1000:.1f}"
+    if filename:
+        response.headers['X-Profile-File'] = filename
+
+    # JSON bodies also carry the summary (list results are wrapped as
+    # 'result') and, when the file could not be stored, the stacks themselves
+    body = response.get_json(silent=True) if response.is_json and not response.is_streamed else None
+    if body is not None:
+        summary = {**profiler.summary(), 'file': filename}
+        if filename is None:
+            summary['collapsed'] = profiler.collapsed()
+        if not isinstance(body, dict):
+            body = {'result': body}
+        body['profile'] = summary
+        response.set_data(json.dumps(body))
+    return response
+
+@app.route('/')
+def index():
+    return render_template('index.html')
+
+@app.route('/api/locations', methods=['GET'])
+def get_locations():
+    # Location records only: what the page needs for its dropdowns and
+    # markers. Roads come from the tiles.
+    try:
+        return jsonify({
+            'neighborhoods': list(cairo_data.neighborhoods),
+            'facilities': list(cairo_data.facilities)
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# The full record lists, kept for existing API clients; the page itself
+# loads /api/locations and the tiles
+@app.route('/api/road_network', methods=['GET'])
+def get_road_network():
+    try:
+        return jsonify({
+            'neighborhoods': list(cairo_data.neighborhoods),
+            'facilities': list(cairo_data.facilities),
+            'existing_roads': list(cairo_data.existing_roads),
+            'potential_roads': list(cairo_data.potential_roads)
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/road_network/tiles/<int:z>/<int:x>/<int:y>', methods=['GET'])
+def get_road_network_tile(z, x, y):
+    # Locations and roads of one map tile at the detail its zoom calls for.
+    # Each zoom level is built whole on first request; clients revalidate
+    # with If-None-Match.
+    try:
+        if z > MAX_ZOOM:
+            return jsonify({'error': f'z must be between 0 and {MAX_ZOOM}'}), 400
+        if x >= 2 ** z or y >= 2 ** z:
+            return jsonify({'error': 'Tile is outside the map'}), 404
+        
+        body, etag = get_zoom_tiles(cairo_data, z).get(x, y)
+        if etag in request.if_none_match:
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'public, max-age=300'
+        return response
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/shortest_path', methods=['POST'])
+@_shared_cache
+def find_shortest_path():
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+            
+        start = _resolve_location(data.get('start'))
+        end = _resolve_location(data.get('end'))
+        time_of_day = data.get('time_of_day', 'morning')
+        
+        # Validate inputs
+        error = _route_query_error(start, end)
+        if error:
+            return jsonify({'error': error[0]}), error[1]
+        
+        error = _time_of_day_error(time_of_day)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        alternatives = _alternatives_count(data)
+        if alternatives is None:
+            return jsonify({'error': f'alternatives must be an integer between 0 and {MAX_ALTERNATIVES}'}), 400
+        
+        engine = data.get('engine', 'dijkstra')
+        if engine not in ENGINES:
+            return jsonify({'error': f"engine must be one of {', '.join(ENGINES)}"}), 400
+        
+        if data.get('departure_time') is not None:
+            result = _time_dependent_route(start, end, data['departure_time'], emergency=False)
+            if result is None:
+                return jsonify({'error': 'Invalid departure_time'}), 400
+            return jsonify(result)
+        
+        path_finder = ShortestPathFinder(cairo_data, route_tables, engine=engine)
+        result = path_finder.find_shortest_path(str(start), str(end), time_of_day)
+        _add_alternatives(result, str(start), str(end), time_of_day, False, alternatives)
+        
+        return jsonify(result)
+        
+    except Exception as e:
+        return jsonify({'error': f'Failed to calculate path: {str(e)}'}), 500
+
+@app.route('/api/optimize_network', methods=['POST'])
+@_shared_cache
+def optimize_network():
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+            
+        optimizer = MSTOptimizer(cairo_data)
+        use_prim = data.get('algorithm', 'prim') == 'prim'
+        prioritize_population = data.get('prioritize_population', True)
+        
+        if _wants_stream():
+            # Edges go out as the tree grows, not after it is complete
+            return _ndjson_response(optimizer.iter_network(use_prim, prioritize_population))
+        
+        result = optimizer.optimize_network(use_prim=use_prim, prioritize_population=prioritize_population)
+        return jsonify(result)
+        
+    except Exception as e:
+        return jsonify({'error': f'Network optimization failed: {str(e)}'}), 500
+
+@app.route('/api/optimize_transport', methods=['POST'])
+@_shared_cache
+def optimize_transport():
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        # Buses to distribute across routes; defaults to the current fleet
+        fleet_size = data.get('fleet_size')
+        if fleet_size is not None and (not isinstance(fleet_size, int) or isinstance(fleet_size, bool)
+                                       or fleet_size < 0 or fleet_size > MAX_FLEET_SIZE):
+            return jsonify({'error': f'fleet_size must be an integer between 0 and {MAX_FLEET_SIZE}'}), 400
+        
+        optimizer = PublicTransportOptimizer(cairo_data)
+        if _wants_stream():
+            return _ndjson_response(optimizer.iter_schedules(fleet_size))
+        
+        result = optimizer.optimize_schedules(fleet_size)
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'error': f'Transport optimization failed: {str(e)}'}), 500
+
+@app.route('/api/optimize_signals', methods=['POST'])
+@_shared_cache
+def optimize_signals():
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+            
+        time_of_day = data.get('time_of_day', 'morning')
+        error = _time_of_day_error(time_of_day)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        optimizer = TrafficSignalOptimizer(cairo_data)
+        if _wants_stream():
+            signals = optimizer.iter_signals(
+                intersections=data.get('intersections', []),
+                time_of_day=time_of_day
+            )
+            return _ndjson_response({'type': 'signal', **plan} for plan in signals)
+        
+        result = optimizer.optimize_signals(
+            intersections=data.get('intersections', []),
+            time_of_day=time_of_day
+        )
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'error': f'Signal optimization failed: {str(e)}'}), 500
+@app.route('/api/emergency_route', methods=['POST'])
+@_shared_cache
+def find_emergency_route():
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+            
+        start = _resolve_location(data.get('start'))
+        end = _resolve_location(data.get('end'))
+        time_of_day = data.get('time_of_day', 'morning')
+        
+        # Validate inputs
+        error = _route_query_error(start, end, emergency=True)
+        if error:
+            return jsonify({'error': error[0]}), error[1]
+        
+        error = _time_of_day_error(time_of_day)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        alternatives = _alternatives_count(data)
+        if alternatives is None:
+            return jsonify({'error': f'alternatives must be an integer between 0 and {MAX_ALTERNATIVES}'}), 400
+        
+        engine = data.get('engine', 'dijkstra')
+        if engine not in ENGINES:
+            return jsonify({'error': f"engine must be one of {', '.join(ENGINES)}"}), 400
+        
+        if data.get('departure_time') is not None:
+            result = _time_dependent_route(start, end, data['departure_time'], emergency=True)
+            if result is None:
+                return jsonify({'error': 'Invalid departure_time'}), 400
+        else:
+            path_finder = ShortestPathFinder(cairo_data, route_tables, engine=engine)
+            result = path_finder.emergency_route(str(start), str(end), time_of_day)
+            _add_alternatives(result, str(start), str(end), time_of_day, True, alternatives)
+        
+        _add_path_coords(result)
+        
+        return jsonify(result)
+        
+    except Exception as e:
+        return jsonify({'error': f'Failed to calculate emergency route: {str(e)}'}), 500
+        
+    except Exception as e:
+        return jsonify({'error': f'Failed to calculate emergency route: {str(e)}'}), 500
+
+@app.route('/api/routes/batch', methods=['POST'])
+@_shared_cache
+def find_routes_batch():
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+        
+        queries = data.get('queries')
+        if not isinstance(queries, list) or not queries:
+            return jsonify({'error': 'queries must be a non-empty list'}), 400
+        
+        if len(queries) > MAX_BATCH_QUERIES:
+            return jsonify({'error': f'At most {MAX_BATCH_QUERIES} queries per batch'}), 400
+        
+        # Validate every item up front; invalid items get a per-item error
+        results = [None] * len(queries)
+        valid = []
+        for i, query in enumerate(queries):
+            if not isinstance(query, dict):
+                results[i] = {'error': 'Query must be an object', 'status': 400}
+                continue
+            
+            emergency = query.get('emergency', False)
+            if not isinstance(emergency, bool):
+                results[i] = {'error': 'emergency must be a boolean', 'status': 400}
+                continue
+            
+            start = _resolve_location(query.get('start'))
+            end = _resolve_location(query.get('end'))
+            error = _route_query_error(start, end, emergency)
+            if error:
+                results[i] = {'error': error[0], 'status': error[1]}
+                continue
+            
+            time_of_day = query.get('time_of_day', data.get('time_of_day', 'morning'))
+            error = _time_of_day_error(time_of_day)
+            if error:
+                results[i] = {'error': error, 'status': 400}
+                continue
+            
+            valid.append((i, {
+                'start': start,
+                'end': end,
+                'time_of_day': time_of_day,
+                'emergency': emergency
+            }))
+        
+        path_finder = ShortestPathFinder(cairo_data, route_tables)
+        routes = path_finder.iter_routes_batch([query for _, query in valid])
+        
+        def iter_results():
+            # Merge computed routes back between the invalid items, in order
+            pending = iter(zip(valid, routes))
+            for i, result in enumerate(results):
+                if result is None:
+                    (_, query), result = next(pending)
+                    if query['emergency']:
+                        _add_path_coords(result)
+                yield i, result
+        
+        if _wants_stream():
+            return _ndjson_response({'type': 'route', 'index': i, **result} for i, result in iter_results())
+        
+        merged = [result for _, result in iter_results()]
+        return jsonify({'results': merged, 'count': len(merged)})
+        
+    except Exception as e:
+        return jsonify({'error': f'Batch routing failed: {str(e)}'}), 500
+
+@app.route('/api/nearest_hospital', methods=['POST'])
+@_shared_cache
+def find_nearest_hospital():
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+        
+        start = _resolve_location(data.get('start'))
+        time_of_day = data.get('time_of_day', 'morning')
+        
+        if not start:
+            return jsonify({'error': 'Missing start location'}), 400
+        
+        if not cairo_data.location_exists(start):
+            return jsonify({'error': f'Start location ID {start} not found'}), 404
+        
+        error = _time_of_day_error(time_of_day)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        result = HospitalCoverage(cairo_data).nearest_hospital_route(start, time_of_day)
+        if result.get('error'):
+            return jsonify(result), 404
+        
+        return jsonify(_add_path_coords(result))
+        
+    except Exception as e:
+        return jsonify({'error': f'Failed to find nearest hospital: {str(e)}'}), 500
+
+@app.route('/api/isochrone', methods=['POST'])
+@_shared_cache
+def hospital_isochrone():
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+        
+        minutes = data.get('minutes')
+        time_of_day = data.get('time_of_day', 'morning')
+        hospital = data.get('hospital')
+        
+        if not isinstance(minutes, (int, float)) or isinstance(minutes, bool) or minutes < 0:
+            return jsonify({'error': 'minutes must be a non-negative number'}), 400
+        
+        error = _time_of_day_error(time_of_day)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        if hospital is not None:
+            facility = cairo_data.get_facility(hospital)
+            if not facility or 'Medical' not in facility['type']:
+                return jsonify({'error': 'hospital must be a medical facility'}), 400
+        
+        nodes = HospitalCoverage(cairo_data).isochrone(minutes, time_of_day, hospital)
+        return jsonify({
+            'minutes': minutes,
+            'time_of_day': time_of_day,
+            'hospital': hospital,
+            'nodes': nodes,
+            'count': len(nodes)
+        })
+        
+    except Exception as e:
+        return jsonify({'error': f'Isochrone calculation failed: {str(e)}'}), 500
+
+@app.route('/api/emergency_dispatch', methods=['POST'])
+@_shared_cache
+def dispatch_emergencies():
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+        
+        incidents = data.get('incidents')
+        time_of_day = data.get('time_of_day', 'morning')
+        capacities = data.get('capacities') or {}
+        
+        if not isinstance(incidents, list) or not incidents:
+            return jsonify({'error': 'incidents must be a non-empty list'}), 400
+        
+        if len(incidents) > MAX_DISPATCH_INCIDENTS:
+            return jsonify({'error': f'At most {MAX_DISPATCH_INCIDENTS} incidents per dispatch'}), 400
+        
+        error = _time_of_day_error(time_of_day)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        locations = []
+        for incident in incidents:
+            location = _resolve_location(incident)
+            if not location or not cairo_data.location_exists(location):
+                return jsonify({'error': f'Incident location {incident} not found'}), 404
+            locations.append(location)
+        
+        # Optional {hospital: max incidents}; hospitals left out are unlimited
+        if not isinstance(capacities, dict):
+            return jsonify({'error': 'capacities must be an object'}), 400
+        for hospital, capacity in capacities.items():
+            facility = cairo_data.get_facility(hospital)
+            if not facility or 'Medical' not in facility['type']:
+                return jsonify({'error': f'{hospital} is not a medical facility'}), 400
+            if not isinstance(capacity, int) or isinstance(capacity, bool) or capacity < 0:
+                return jsonify({'error': 'capacities must be non-negative integers'}), 400
+        
+        result = HospitalCoverage(cairo_data).dispatch(locations, time_of_day, capacities)
+        for route in result['assignments']:
+            _add_path_coords(route)
+        return jsonify(result)
+        
+    except Exception as e:
+        return jsonify({'error': f'Emergency dispatch failed: {str(e)}'}), 500
+
+@app.route('/api/transit_journey', methods=['POST'])
+@_shared_cache
+def plan_transit_journey():
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+        
+        start = _resolve_location(data.get('start'))
+        end = _resolve_location(data.get('end'))
+        time_of_day = data.get('time_of_day', 'morning')
+        max_transfers = data.get('max_transfers', 3)
+        transfer_mode = data.get('transfer_mode', 'walk')
+        
+        error = _route_query_error(start, end)
+        if error:
+            return jsonify({'error': error[0]}), error[1]
+        
+        if not isinstance(max_transfers, int) or isinstance(max_transfers, bool) or \
+                not 0 <= max_transfers <= MAX_TRANSIT_TRANSFERS:
+            return jsonify({'error': f'max_transfers must be an integer between 0 and {MAX_TRANSIT_TRANSFERS}'}), 400
+        
+        if transfer_mode not in TRANSFER_MODES:
+            return jsonify({'error': f"transfer_mode must be one of {', '.join(TRANSFER_MODES)}"}), 400
+        
+        error = _time_of_day_error(time_of_day)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        journeys = TransitRouter(cairo_data).plan(str(start), str(end), time_of_day, max_transfers, transfer_mode)
+        if not journeys:
+            return jsonify({'journeys': [], 'error': 'No journey found'}), 404
+        
+        return jsonify({
+            'start': str(start),
+            'end': str(end),
+            'time_of_day': time_of_day,
+            'journeys': journeys
+        })
+        
+    except Exception as e:
+        return jsonify({'error': f'Journey planning failed: {str(e)}'}), 500
+
+@app.route('/api/traffic_assignment', methods=['POST'])
+@_shared_cache
+def assign_traffic():
+    try:
+        data = request.get_json(silent=True) or {}
+        time_of_day = data.get('time_of_day')
+        max_iterations = data.get('max_iterations', MAX_ITERATIONS)
+        tolerance = data.get('tolerance', TOLERANCE)
+        
+        if time_of_day is not None and time_of_day not in TIME_SLOTS:
+            return jsonify({'error': f"time_of_day must be one of {', '.join(TIME_SLOTS)}"}), 400
+        
+        if not isinstance(max_iterations, int) or isinstance(max_iterations, bool) or \
+                not 0 <= max_iterations <= MAX_ASSIGNMENT_ITERATIONS:
+            return jsonify({'error': f'max_iterations must be an integer between 0 and {MAX_ASSIGNMENT_ITERATIONS}'}), 400
+        
+        if not isinstance(tolerance, (int, float)) or isinstance(tolerance, bool) or tolerance < 0:
+            return jsonify({'error': 'tolerance must be a non-negative number'}), 400
+        
+        # Default runs are cached per slot until that slot's traffic changes
+        assignment = TrafficAssignment(cairo_data)
+        slots = [time_of_day] if time_of_day else TIME_SLOTS
+        if max_iterations == MAX_ITERATIONS and tolerance == TOLERANCE:
+            results = {slot: assignment.get_assignment(slot) for slot in slots}
+        else:
+            results = {slot: assignment.assign(slot, max_iterations, tolerance) for slot in slots}
+        
+        return jsonify({'slots': results})
+        
+    except Exception as e:
+        return jsonify({'error': f'Traffic assignment failed: {str(e)}'}), 500
+
+@app.route('/api/rank_potential_roads', methods=['POST'])
+@_shared_cache
+def rank_potential_roads():
+    try:
+        data = request.get_json(silent=True) or {}
+        time_of_day = data.get('time_of_day', 'morning')
+        budget = data.get('budget')
+        order_by = data.get('order_by', 'benefit_per_cost')
+        
+        if time_of_day not in TIME_SLOTS:
+            return jsonify({'error': f"time_of_day must be one of {', '.join(TIME_SLOTS)}"}), 400
+        
+        if budget is not None and (not isinstance(budget, (int, float)) or isinstance(budget, bool) or budget < 0):
+            return jsonify({'error': 'budget must be a non-negative number'}), 400
+        
+        if order_by not in ORDER_KEYS:
+            return jsonify({'error': f"order_by must be one of {', '.join(ORDER_KEYS)}"}), 400
+        
+        return jsonify(PotentialRoadRanker(cairo_data).rank(time_of_day, budget, order_by))
+        
+    except Exception as e:
+        return jsonify({'error': f'Potential road ranking failed: {str(e)}'}), 500
+
+def _location_summary(loc, distance=None):
+    summary = {
+        'id': loc['id'],
+        'name': loc.get('name', ''),
+        'type': loc.get('type', ''),
+        'lat': loc['y'],
+        'lng': loc['x']
+    }
+    if distance is not None:
+        summary['distance_km'] = distance
+    return summary
+
+@app.route('/api/nearest', methods=['GET'])
+def find_nearest():
+    try:
+        try:
+            lat = float(request.args['lat'])
+            lng = float(request.args['lng'])
+            k = int(request.args.get('k', 1))
+        except (KeyError, ValueError):
+            return jsonify({'error': 'lat and lng are required numbers, k an integer'}), 400
+        
+        kind = request.args.get('kind', 'location')
+        if k < 1 or k > 100:
+            return jsonify({'error': 'k must be between 1 and 100'}), 400
+        
+        if kind == 'location':
+            results = [
+                _location_summary(cairo_data.locations.record(row), distance)
+                for distance, row in cairo_data.spatial_index.nearest_points(lng, lat, k)
+            ]
+        elif kind == 'road':
+            results = [
+                {
+                    'from': cairo_data.roads.from_ids[row],
+                    'to': cairo_data.roads.to_ids[row],
+                    'distance_km': distance,
+                    'snapped': {'lat': y, 'lng': x}
+                }
+                for distance, row, (x, y) in cairo_data.spatial_index.nearest_segments(lng, lat, k)
+            ]
+        else:
+            return jsonify({'error': 'kind must be location or road'}), 400
+        
+        return jsonify({'results': results, 'count': len(results)})
+        
+    except Exception as e:
+        return jsonify({'error': f'Nearest query failed: {str(e)}'}), 500
+
+@app.route('/api/within_bbox', methods=['GET'])
+def find_within_bbox():
+    try:
+        try:
+            min_lat = float(request.args['min_lat'])
+            min_lng = float(request.args['min_lng'])
+            max_lat = float(request.args['max_lat'])
+            max_lng = float(request.args['max_lng'])
+        except (KeyError, ValueError):
+            return jsonify({'error': 'min_lat, min_lng, max_lat and max_lng are required numbers'}), 400
+        
+        if min_lat > max_lat or min_lng > max_lng:
+            return jsonify({'error': 'Empty bounding box'}), 400
+        
+        index = cairo_data.spatial_index
+        return jsonify({
+            'locations': [
+                _location_summary(cairo_data.locations.record(row))
+                for row in index.points_in_bbox(min_lng, min_lat, max_lng, max_lat)
+            ],
+            'roads': [cairo_data.roads.record(row) for row in index.segments_in_bbox(min_lng, min_lat, max_lng, max_lat)]
+        })
+        
+    except Exception as e:
+        return jsonify({'error': f'Bounding box query failed: {str(e)}'}), 500
+
+@app.route('/api/traffic_updates', methods=['POST'])
+def push_traffic_updates():
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+        
+        updates = data.get('updates')
+        if not isinstance(updates, list) or not updates:
+            return jsonify({'error': 'updates must be a non-empty list'}), 400
+        
+        if len(updates) > MAX_TRAFFIC_UPDATES:
+            return jsonify({'error': f'At most {MAX_TRAFFIC_UPDATES} updates per request'}), 400
+        
+        # Roads may be given as {'road': 'from-to'} or {'from', 'to'}
+        parsed = []
+        errors = []
+        for i, update in enumerate(updates):
+            if not isinstance(update, dict):
+                errors.append({'index': i, 'error': 'Update must be an object'})
+                continue
+            
+            if 'road' in update:
+                from_id, _, to_id = str(update['road']).partition('-')
+            else:
+                from_id, to_id = update.get('from'), update.get('to')
+            
+            time_of_day = update.get('time_of_day')
+            traffic = update.get('traffic')
+            
+            if not cairo_data.get_road_between(from_id, to_id):
+                errors.append({'index': i, 'error': f'No road between {from_id} and {to_id}'})
+            elif time_of_day not in TIME_SLOTS:
+                errors.append({'index': i, 'error': f'time_of_day must be one of {TIME_SLOTS}'})
+            elif not isinstance(traffic, (int, float)) or isinstance(traffic, bool) or traffic < 0:
+                errors.append({'index': i, 'error': 'traffic must be a non-negative number'})
+            else:
+                parsed.append({'from': from_id, 'to': to_id, 'time_of_day': time_of_day, 'traffic': traffic})
+        
+        stats = traffic_updater.apply_updates(parsed)
+        stats['errors'] = errors
+        return jsonify(stats)
+        
+    except Exception as e:
+        return jsonify({'error': f'Traffic update failed: {str(e)}'}), 500
+
+@app.route('/api/road_closures', methods=['POST'])
+def push_road_closures():
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+        
+        closures = data.get('closures')
+        if not isinstance(closures, list) or not closures:
+            return jsonify({'error': 'closures must be a non-empty list'}), 400
+        
+        if len(closures) > MAX_TRAFFIC_UPDATES:
+            return jsonify({'error': f'At most {MAX_TRAFFIC_UPDATES} closures per request'}), 400
+        
+        # Roads may be given as {'road': 'from-to'} or {'from', 'to'}
+        parsed = []
+        errors = []
+        for i, closure in enumerate(closures):
+            if not isinstance(closure, dict):
+                errors.append({'index': i, 'error': 'Closure must be an object'})
+                continue
+            
+            if 'road' in closure:
+                from_id, _, to_id = str(closure['road']).partition('-')
+            else:
+                from_id, to_id = closure.get('from'), closure.get('to')
+            
+            closed = closure.get('closed', True)
+            
+            if not cairo_data.get_road_between(from_id, to_id):
+                errors.append({'index': i, 'error': f'No road between {from_id} and {to_id}'})
+            elif not isinstance(closed, bool):
+                errors.append({'index': i, 'error': 'closed must be a boolean'})
+            else:
+                parsed.append({'from': from_id, 'to': to_id, 'closed': closed})
+        
+        stats = traffic_updater.apply_closures(parsed)
+        stats['components'] = len(cairo_data.connectivity.members)
+        stats['errors'] = errors
+        return jsonify(stats)
+        
+    except Exception as e:
+        return jsonify({'error': f'Road closure update failed: {str(e)}'}), 500
+
+@app.route('/api/critical_roads', methods=['GET'])
+def get_critical_roads():
+    # Bridges and articulation points on the routes to the critical
+    # facilities (or ?facilities=F1,F9), under the current closures
+    try:
+        facilities = CRITICAL_FACILITIES
+        if request.args.get('facilities'):
+            facilities = [f.strip() for f in request.args['facilities'].split(',') if f.strip()]
+            unknown = [f for f in facilities if not cairo_data.location_exists(f)]
+            if unknown:
+                return jsonify({'error': f'Unknown locations: {", ".join(unknown)}'}), 404
+        
+        return jsonify(MSTOptimizer(cairo_data).single_points_of_failure(facilities))
+        
+    except Exception as e:
+        return jsonify({'error': f'Critical road analysis failed: {str(e)}'}), 500
+
+if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
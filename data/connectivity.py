@@ -0,0 +1,111 @@
+class RoadConnectivity:
+    """Connected components, bridges and articulation points of the open
+    roads, from one iterative Tarjan DFS over the road adjacency.
+
+    Nodes are numbered in DFS order, so every DFS subtree is a contiguous
+    slice of self.order; this makes connectivity checks O(1) and lets the
+    locations cut off by any single failure be listed without a search."""
+
+    def __init__(self, adjacency, closed=frozenset()):
+        self.component = {}  # node -> component number
+        self.members = []  # component number -> nodes
+        self.order = []  # nodes by discovery time
+        self.discovery = {}
+        self.last = {}  # node -> discovery time of the last node in its subtree
+        self.bridges = []  # (road index, child node): the road from child to its DFS parent
+        self.articulation_points = {}  # node -> child nodes whose subtrees it separates
+
+        low = {}
+        for root in adjacency:
+            if root in self.discovery:
+                continue
+            number = len(self.members)
+            start = len(self.order)
+            self._visit(root, number, low, adjacency, closed)
+            self.members.append(self.order[start:])
+
+        for node in [n for n, children in self.articulation_points.items() if not children]:
+            del self.articulation_points[node]
+
+    def _visit(self, root, number, low, adjacency, closed):
+        separated = {}
+        self._discover(root, number, low)
+        stack = [(root, None, iter(adjacency[root].items()))]
+
+        while stack:
+            node, via, neighbors = stack[-1]
+            for neighbor, road_index in neighbors:
+                if road_index in closed or road_index == via:
+                    continue
+                if neighbor in self.discovery:
+                    low[node] = min(low[node], self.discovery[neighbor])
+                else:
+                    self._discover(neighbor, number, low)
+                    stack.append((neighbor, road_index, iter(adjacency[neighbor].items())))
+                    break
+            else:
+                stack.pop()
+                self.last[node] = len(self.order) - 1
+                if not stack:
+                    continue
+                parent = stack[-1][0]
+                low[parent] = min(low[parent], low[node])
+                if low[node] > self.discovery[parent]:
+                    self.bridges.append((via, node))
+                if low[node] >= self.discovery[parent]:
+                    separated.setdefault(parent, []).append(node)
+
+        # The root separates its subtrees only when it has more than one
+        for node, children in separated.items():
+            if node != root or len(children) > 1:
+                self.articulation_points[node] = children
+
+    def _discover(self, node, number, low):
+        self.discovery[node] = low[node] = len(self.order)
+        self.component[node] = number
+        self.order.append(node)
+
+    def connected(self, a, b):
+        """Whether any open road path joins a and b, in O(1)"""
+        return a in self.component and self.component.get(b) == self.component[a]
+
+    def subtree(self, node):
+        return self.order[self.discovery[node]:self.last[node] + 1]
+
+    def in_subtree(self, node, root):
+        return self.discovery[root] <= self.discovery[node] <= self.last[root]
+
+    def single_points_of_failure(self, target):
+        """Bridges and articulation points whose failure cuts locations off
+        from target: ([(road index, cut-off nodes)], [(node, cut-off nodes)]),
+        most cut-off nodes first"""
+        if target not in self.component:
+            return [], []
+        members = self.members[self.component[target]]
+
+        roads = []
+        for road_index, child in self.bridges:
+            if not self.connected(child, target):
+                continue
+            if self.in_subtree(target, child):
+                below = set(self.subtree(child))
+                cut = [node for node in members if node not in below]
+            else:
+                cut = self.subtree(child)
+            roads.append((road_index, cut))
+
+        nodes = []
+        for node, children in self.articulation_points.items():
+            if node == target or not self.connected(node, target):
+                continue
+            holding = next((child for child in children if self.in_subtree(target, child)), None)
+            if holding is None:
+                cut = [n for child in children for n in self.subtree(child)]
+            else:
+                kept = set(self.subtree(holding))
+                cut = [n for n in members if n != node and n not in kept]
+            nodes.append((node, cut))
+
+        roads.sort(key=lambda entry: -len(entry[1]))
+        nodes.sort(key=lambda entry: -len(entry[1]))
+        return roads, nodes
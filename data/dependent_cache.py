@@ -0,0 +1,82 @@
+import threading
+from collections import OrderedDict
+
+
+def road_key(from_id, to_id):
+    """Canonical, direction-free key for the road between two locations"""
+    a, b = str(from_id), str(to_id)
+    return (a, b) if a <= b else (b, a)
+
+
+class DependentCache:
+    """Size-bounded LRU cache whose entries record the time slot and roads
+    they were computed from, so traffic changes can evict just those entries"""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (value, time_of_day, roads)
+        self._by_road = {}  # (time_of_day, road_key) -> set of keys
+        self._by_slot = {}  # time_of_day -> set of keys
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value, time_of_day, roads):
+        roads = frozenset(roads)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time_of_day, roads)
+            self._by_slot.setdefault(time_of_day, set()).add(key)
+            for road in roads:
+                self._by_road.setdefault((time_of_day, road), set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def entries(self):
+        # (key, value, time_of_day, roads) for every entry, oldest first
+        with self._lock:
+            return [(key, value, time_of_day, roads) for key, (value, time_of_day, roads) in self._entries.items()]
+
+    def invalidate_roads(self, time_of_day, roads):
+        # Evict entries in this slot computed from any of the given roads
+        with self._lock:
+            keys = set()
+            for road in roads:
+                keys |= self._by_road.get((time_of_day, road), set())
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def invalidate_slot(self, time_of_day):
+        with self._lock:
+            keys = list(self._by_slot.get(time_of_day, ()))
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_road.clear()
+            self._by_slot.clear()
+
+    def _remove(self, key):
+        _, time_of_day, roads = self._entries.pop(key)
+        self._by_slot[time_of_day].discard(key)
+        for road in roads:
+            keys = self._by_road.get((time_of_day, road))
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_road[(time_of_day, road)]
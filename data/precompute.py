@@ -0,0 +1,126 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from algorithms.centrality import BetweennessCentrality
+from algorithms.crp import Overlay, Partition
+from algorithms.greedy import TrafficSignalOptimizer
+from algorithms.hospital_coverage import HospitalCoverage
+from algorithms.shortest_path import ShortestPathFinder
+from algorithms.traffic_assignment import TrafficAssignment
+from algorithms.transit import TransitRouter
+from data.cairo_data import TIME_SLOTS, CairoData
+
+# Per-slot work units. Each slot is split into independent tasks so startup
+# scales with the number of workers rather than the number of slots.
+TASKS = ['routing_graph', 'emergency_graph', 'signal_plans', 'hospital_coverage', 'transit_network', 'traffic_assignment']
+
+# Betweenness artifacts, computed before the tasks with the sources of each
+# split across the workers, and handed to the task workers for signal_plans
+CENTRALITY = [('betweenness', False), ('betweenness_demand', True)]
+
+_worker_data = None
+
+
+def _init_worker(records, data_version, slot_artifacts):
+    global _worker_data
+    _worker_data = CairoData(load=False)
+    _worker_data.load_records(records, data_version=data_version)
+    _worker_data.slot_artifacts.update(slot_artifacts)
+
+
+def _run_task(task):
+    # Runs in a worker; returns plain picklable results
+    name, time_of_day = task
+    data = _worker_data
+    if name in ('routing_graph', 'emergency_graph'):
+        return task, ShortestPathFinder(data)._compute_edge_weights(time_of_day, name == 'emergency_graph')
+    if name == 'signal_plans':
+        # Default plans rank intersections by the precomputed betweenness
+        TrafficSignalOptimizer(data).optimize_signals([], time_of_day)
+        return task, data.signal_plan_cache.entries()
+    if name == 'hospital_coverage':
+        return task, HospitalCoverage(data)._build_coverage(time_of_day)
+    if name == 'transit_network':
+        return task, TransitRouter(data)._build_network(time_of_day)
+    if name == 'traffic_assignment':
+        return task, TrafficAssignment(data).assign(time_of_day)
+    raise ValueError(f'unknown precompute task {name}')
+
+
+def precompute(cairo_data, workers=None, slots=TIME_SLOTS):
+    # Builds every per-slot artifact, in a process pool when workers > 1,
+    # and installs them all at once. Results are discarded if live traffic
+    # changed the data meanwhile. Returns the number of installed artifacts.
+    global _worker_data
+    if workers is None:
+        workers = os.cpu_count() or 1
+    tasks = [(name, time_of_day) for time_of_day in slots for name in TASKS]
+    data_version = cairo_data.get_data_version()
+    started = time.perf_counter()
+
+    centrality = BetweennessCentrality(cairo_data)
+    results = [
+        ((name, time_of_day), centrality.compute(time_of_day, demand_weighted, workers=workers))
+        for time_of_day in slots for name, demand_weighted in CENTRALITY
+    ]
+    centrality_artifacts = dict(results)
+
+    # Forked workers share the loaded modules; without fork (or with a
+    # single worker) everything runs in this process
+    if workers > 1 and 'fork' in multiprocessing.get_all_start_methods():
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(tasks)),
+            mp_context=multiprocessing.get_context('fork'),
+            initializer=_init_worker,
+            initargs=(cairo_data.get_records(), data_version, centrality_artifacts)
+        ) as pool:
+            results += pool.map(_run_task, tasks)
+    else:
+        _init_worker(cairo_data.get_records(), data_version, centrality_artifacts)
+        try:
+            results += [_run_task(task) for task in tasks]
+        finally:
+            _worker_data = None
+
+    # Routing graphs are compiled here so their CRP overlays can be
+    # customized with the cells split across the workers
+    path_finder = ShortestPathFinder(cairo_data)
+    partition = cairo_data.get_compiled_graph(('crp_partition',), lambda: Partition(cairo_data))
+    graphs = {}
+    for (name, time_of_day), value in results:
+        if name in ('routing_graph', 'emergency_graph'):
+            key = (time_of_day, name == 'emergency_graph')
+            graphs[key] = path_finder._graph_from_edge_weights(value)
+            graphs[('crp',) + key] = Overlay(partition, graphs[key], workers)
+
+    with cairo_data.update_lock:
+        if cairo_data.get_data_version() != data_version:
+            print('Precomputed artifacts discarded, data changed meanwhile')
+            return 0
+        _install(cairo_data, results, graphs)
+
+    print(f"Precomputed {len(results)} artifacts for {len(slots)} time slots "
+          f"in {time.perf_counter() - started:.2f}s")
+    return len(results)
+
+
+def _install(cairo_data, results, graphs):
+    # New dicts are swapped in whole, so readers see either none or all of
+    # the precomputed graphs and artifacts
+    compiled_graphs = {**cairo_data.compiled_graphs, **graphs}
+    slot_artifacts = dict(cairo_data.slot_artifacts)
+    signal_plans = []
+
+    for (name, time_of_day), value in results:
+        # Routing graphs arrive compiled, in graphs
+        if name == 'signal_plans':
+            signal_plans.extend(value)
+        elif name not in ('routing_graph', 'emergency_graph'):
+            slot_artifacts[(name, time_of_day)] = value
+
+    cairo_data.compiled_graphs = compiled_graphs
+    cairo_data.slot_artifacts = slot_artifacts
+    for key, plan, time_of_day, roads in signal_plans:
+        cairo_data.signal_plan_cache.put(key, plan, time_of_day, roads)
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+def code_version(root, packages=('algorithms', 'data')):
+    """Hash of the application sources under root, so results stored by
+    another build of the code are never served"""
+    digest = hashlib.sha256()
+    paths = [os.path.join(root, name) for name in sorted(os.listdir(root)) if name.endswith('.py')]
+    for package in packages:
+        directory = os.path.join(root, package)
+        paths.extend(os.path.join(directory, name) for name in sorted(os.listdir(directory)) if name.endswith('.py'))
+    for path in paths:
+        digest.update(path[len(root):].encode('utf-8'))
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def payload_key(endpoint, payload, data_version, namespace=''):
+    """Canonical key of a request: the same endpoint, JSON payload (in any key
+    order), data version and namespace always map to the same key"""
+    encoded = json.dumps(
+        {'endpoint': endpoint, 'payload': payload, 'data_version': data_version, 'namespace': namespace},
+        sort_keys=True, separators=(',', ':'), default=str
+    )
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """Size-bounded LRU cache of response bodies in a SQLite file, shared by
+    every worker process serving the same data. The namespace (typically the
+    code version) is part of every key. Failures of the store are treated as
+    misses so they never break a request.
+
+    Hits are written back as last-used times in batches of flush_every, and
+    each process evicts once per evict_every of its own inserts, so the
+    store may briefly hold up to evict_every entries per process beyond
+    max_entries."""
+
+    def __init__(self, path, max_entries=10000, namespace='', flush_every=100, evict_every=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.namespace = namespace
+        self.flush_every = flush_every
+        self.evict_every = evict_every or max(1, max_entries // 10)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._used = {}  # key -> last hit time not yet written
+        self._puts = 0  # inserts since the last eviction
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            'key TEXT PRIMARY KEY, endpoint TEXT NOT NULL, body TEXT NOT NULL, used REAL NOT NULL)'
+        )
+        self._execute('CREATE INDEX IF NOT EXISTS results_used ON results (used)')
+
+    def get(self, endpoint, payload, data_version):
+        key = payload_key(endpoint, payload, data_version, self.namespace)
+        rows = self._execute('SELECT body FROM results WHERE key = ?', (key,))
+        if not rows:
+            return None
+        with self._lock:
+            self._used[key] = time.time()
+            flush = len(self._used) >= self.flush_every
+        if flush:
+            self.flush()
+        return rows[0][0]
+
+    def put(self, endpoint, payload, data_version, body):
+        key = payload_key(endpoint, payload, data_version, self.namespace)
+        self._execute(
+            'INSERT OR REPLACE INTO results (key, endpoint, body, used) VALUES (?, ?, ?, ?)',
+            (key, endpoint, body, time.time())
+        )
+        with self._lock:
+            self._puts += 1
+            evict = self._puts >= self.evict_every
+            if evict:
+                self._puts = 0
+        if evict:
+            self.evict()
+
+    def flush(self):
+        """Write the pending last-used times of hits in one transaction"""
+        with self._lock:
+            used, self._used = self._used, {}
+        if used:
+            self._execute_many(
+                'UPDATE results SET used = ? WHERE key = ? AND used < ?',
+                [(at, key, at) for key, at in used.items()]
+            )
+
+    def evict(self):
+        """Drop the least recently used entries beyond max_entries"""
+        # Pending hits count as uses, so they are written first
+        self.flush()
+        self._execute(
+            'DELETE FROM results WHERE key IN ('
+            'SELECT key FROM results ORDER BY used DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        )
+
+    def clear(self):
+        with self._lock:
+            self._used = {}
+            self._puts = 0
+        self._execute('DELETE FROM results')
+
+    def __len__(self):
+        rows = self._execute('SELECT COUNT(*) FROM results')
+        return rows[0][0] if rows else 0
+
+    def _connection(self):
+        # One connection per thread, reopened after a fork
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _execute(self, sql, params=()):
+        try:
+            return self._connection().execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            print(f"Result cache error: {e}")
+            return []
+
+    def _execute_many(self, sql, rows):
+        connection = None
+        try:
+            connection = self._connection()
+            connection.execute('BEGIN')
+            connection.executemany(sql, rows)
+            connection.execute('COMMIT')
+        except sqlite3.Error as e:
+            print(f"Result cache error: {e}")
+            if connection is not None and connection.in_transaction:
+                connection.execute('ROLLBACK')
@@ -0,0 +1,198 @@
+import heapq
+import math
+
+KM_PER_DEGREE = 111.32
+
+
+class SpatialIndex:
+    """Uniform grid over locations (points) and roads (segments).
+
+    Coordinates are projected once to kilometres around a reference latitude,
+    so nearest-neighbour searches expand ring by ring from the query cell and
+    stop as soon as no unexplored cell can hold anything closer."""
+
+    def __init__(self, reference_lat=30.0, cell_km=2.0):
+        self.cell_km = cell_km
+        self._x_scale = KM_PER_DEGREE * math.cos(math.radians(reference_lat))
+        self._points = {}  # cell -> [(px, py, item)]
+        self._segments = {}  # cell -> [(ax, ay, bx, by, item)]
+        self._point_count = 0
+        self._segment_count = 0
+        self._bounds = None  # (min_cx, min_cy, max_cx, max_cy)
+
+    def project(self, x, y):
+        return x * self._x_scale, y * KM_PER_DEGREE
+
+    def unproject(self, px, py):
+        return px / self._x_scale, py / KM_PER_DEGREE
+
+    def add_point(self, x, y, item):
+        px, py = self.project(x, y)
+        cell = self._cell(px, py)
+        self._points.setdefault(cell, []).append((px, py, item))
+        self._point_count += 1
+        self._extend_bounds(cell, cell)
+
+    def add_segment(self, x1, y1, x2, y2, item):
+        # Segments are registered in every cell of their bounding box
+        ax, ay = self.project(x1, y1)
+        bx, by = self.project(x2, y2)
+        entry = (ax, ay, bx, by, item)
+        min_cell = self._cell(min(ax, bx), min(ay, by))
+        max_cell = self._cell(max(ax, bx), max(ay, by))
+        for cx in range(min_cell[0], max_cell[0] + 1):
+            for cy in range(min_cell[1], max_cell[1] + 1):
+                self._segments.setdefault((cx, cy), []).append(entry)
+        self._segment_count += 1
+        self._extend_bounds(min_cell, max_cell)
+
+    def nearest_points(self, x, y, k=1, accept=None):
+        # Returns up to k (distance_km, item) pairs, closest first, only of
+        # items for which accept(item) is true when it is given
+        keep = None if accept is None else (lambda entry: accept(entry[2]))
+        results = self._nearest(x, y, k, self._points, self._point_count, self._point_distance, keep)
+        return [(distance, entry[2]) for distance, entry in results]
+
+    def nearest_segments(self, x, y, k=1):
+        # Returns up to k (distance_km, item, (x, y) of the closest point)
+        results = self._nearest(x, y, k, self._segments, self._segment_count, self._segment_distance)
+        return [(distance, entry[4], self._closest_on_segment(x, y, entry)) for distance, entry in results]
+
+    def points_in_bbox(self, min_x, min_y, max_x, max_y):
+        items = []
+        for px, py, item in self._scan(self._points, min_x, min_y, max_x, max_y):
+            x, y = self.unproject(px, py)
+            if min_x <= x <= max_x and min_y <= y <= max_y:
+                items.append(item)
+        return items
+
+    def segments_in_bbox(self, min_x, min_y, max_x, max_y):
+        # Segments with an endpoint inside the box or crossing one of its edges
+        items = []
+        seen = set()
+        for entry in self._scan(self._segments, min_x, min_y, max_x, max_y):
+            if id(entry) in seen:
+                continue
+            seen.add(id(entry))
+            if self._segment_touches_bbox(entry, min_x, min_y, max_x, max_y):
+                items.append(entry[4])
+        return items
+
+    def _nearest(self, x, y, k, cells, count, distance_of, keep=None):
+        qx, qy = self.project(x, y)
+        center = self._cell(qx, qy)
+        best = []  # max-heap of (-distance, tiebreak, entry)
+        seen = set()
+        k = min(k, count)
+        if k <= 0:
+            return []
+
+        # Rings closer than the indexed area are empty, so start at its edge
+        min_cx, min_cy, max_cx, max_cy = self._bounds
+        ring = max(0, min_cx - center[0], center[0] - max_cx, min_cy - center[1], center[1] - max_cy)
+        while True:
+            for cell in self._ring_cells(center, ring):
+                for entry in cells.get(cell, ()):
+                    if id(entry) in seen:
+                        continue
+                    seen.add(id(entry))
+                    if keep is not None and not keep(entry):
+                        continue
+                    distance = distance_of(qx, qy, entry)
+                    if len(best) < k:
+                        heapq.heappush(best, (-distance, id(entry), entry))
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, (-distance, id(entry), entry))
+
+            # Anything outside the explored rings is at least ring * cell_km away
+            if len(best) == k and -best[0][0] <= ring * self.cell_km:
+                break
+            if not self._ring_in_bounds(center, ring + 1):
+                break
+            ring += 1
+
+        return [(-d, entry) for d, _, entry in sorted(best, reverse=True)]
+
+    def _scan(self, cells, min_x, min_y, max_x, max_y):
+        min_cell = self._cell(*self.project(min_x, min_y))
+        max_cell = self._cell(*self.project(max_x, max_y))
+        for cx in range(min_cell[0], max_cell[0] + 1):
+            for cy in range(min_cell[1], max_cell[1] + 1):
+                yield from cells.get((cx, cy), ())
+
+    def _cell(self, px, py):
+        return int(math.floor(px / self.cell_km)), int(math.floor(py / self.cell_km))
+
+    def _ring_cells(self, center, ring):
+        # Cells at Chebyshev distance ring from center, clipped to the bounds
+        cx, cy = center
+        min_cx, min_cy, max_cx, max_cy = self._bounds
+        if ring == 0:
+            yield center
+            return
+        x_range = range(max(cx - ring, min_cx), min(cx + ring, max_cx) + 1)
+        for y in (cy - ring, cy + ring):
+            if min_cy <= y <= max_cy:
+                for x in x_range:
+                    yield (x, y)
+        y_range = range(max(cy - ring + 1, min_cy), min(cy + ring - 1, max_cy) + 1)
+        for x in (cx - ring, cx + ring):
+            if min_cx <= x <= max_cx:
+                for y in y_range:
+                    yield (x, y)
+
+    def _ring_in_bounds(self, center, ring):
+        # False once the ring lies entirely outside every indexed cell
+        min_cx, min_cy, max_cx, max_cy = self._bounds
+        cx, cy = center
+        return not (cx - ring < min_cx and cx + ring > max_cx and cy - ring < min_cy and cy + ring > max_cy)
+
+    def _extend_bounds(self, min_cell, max_cell):
+        if self._bounds is None:
+            self._bounds = (min_cell[0], min_cell[1], max_cell[0], max_cell[1])
+        else:
+            b = self._bounds
+            self._bounds = (min(b[0], min_cell[0]), min(b[1], min_cell[1]),
+                            max(b[2], max_cell[0]), max(b[3], max_cell[1]))
+
+    def _point_distance(self, qx, qy, entry):
+        return math.hypot(entry[0] - qx, entry[1] - qy)
+
+    def _segment_fraction(self, qx, qy, entry):
+        ax, ay, bx, by, _ = entry
+        dx, dy = bx - ax, by - ay
+        length_sq = dx * dx + dy * dy
+        if length_sq == 0:
+            return 0.0
+        return max(0.0, min(1.0, ((qx - ax) * dx + (qy - ay) * dy) / length_sq))
+
+    def _segment_distance(self, qx, qy, entry):
+        ax, ay, bx, by, _ = entry
+        t = self._segment_fraction(qx, qy, entry)
+        return math.hypot(ax + t * (bx - ax) - qx, ay + t * (by - ay) - qy)
+
+    def _closest_on_segment(self, x, y, entry):
+        qx, qy = self.project(x, y)
+        ax, ay, bx, by, _ = entry
+        t = self._segment_fraction(qx, qy, entry)
+        return self.unproject(ax + t * (bx - ax), ay + t * (by - ay))
+
+    def _segment_touches_bbox(self, entry, min_x, min_y, max_x, max_y):
+        # Liang-Barsky clipping of the segment against the box
+        x1, y1 = self.unproject(entry[0], entry[1])
+        x2, y2 = self.unproject(entry[2], entry[3])
+        dx, dy = x2 - x1, y2 - y1
+        t0, t1 = 0.0, 1.0
+        for p, q in ((-dx, x1 - min_x), (dx, max_x - x1), (-dy, y1 - min_y), (dy, max_y - y1)):
+            if p == 0:
+                if q < 0:
+                    return False
+                continue
+            t = q / p
+            if p < 0:
+                t0 = max(t0, t)
+            else:
+                t1 = min(t1, t)
+            if t0 > t1:
+                return False
+        return True
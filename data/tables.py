@@ -0,0 +1,142 @@
+from array import array
+from collections.abc import Sequence
+
+# Column values filled in for records lacking a field; the field is still
+# left out of the rebuilt record
+LOCATION_DEFAULTS = {'name': '', 'type': '', 'population': 0}
+ROAD_DEFAULTS = {'condition': 10, 'cost': 0}
+
+
+def _column(values):
+    # Most compact container giving every value back with its original type:
+    # int64 or float64 arrays for uniform numbers, a plain list otherwise
+    if all(type(v) is int for v in values):
+        try:
+            return array('q', values)
+        except OverflowError:
+            return values
+    if all(type(v) is float for v in values):
+        return array('d', values)
+    return values
+
+
+class _Columns:
+    """Records stored column by column. Fields keep their first-seen order;
+    rows lacking a field hold its default and are listed in missing."""
+
+    __slots__ = ('fields', 'columns', 'missing', 'count')
+
+    def __init__(self, records, defaults):
+        fields = {}
+        for record in records:
+            for field in record:
+                fields.setdefault(field, None)
+        self.fields = tuple(fields)
+        self.count = len(records)
+        self.columns = {}
+        self.missing = {}
+        for field in self.fields:
+            default = defaults.get(field)
+            values = []
+            for i, record in enumerate(records):
+                if field in record:
+                    values.append(record[field])
+                else:
+                    values.append(default)
+                    self.missing.setdefault(field, set()).add(i)
+            self.columns[field] = _column(values)
+        for field, default in defaults.items():
+            if field not in self.columns:
+                self.columns[field] = _column([default] * self.count)
+
+    def record(self, i):
+        return {
+            field: self.columns[field][i] for field in self.fields
+            if i not in self.missing.get(field, ())
+        }
+
+
+class RecordView(Sequence):
+    """Read-only list of rows start..stop of a table; each item is a fresh
+    dict built on access, so nothing holds per-record dicts"""
+
+    __slots__ = ('table', 'start', 'stop')
+
+    def __init__(self, table, start=0, stop=None):
+        self.table = table
+        self.start = start
+        self.stop = len(table) if stop is None else stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.table.record(self.start + j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('record index out of range')
+        return self.table.record(self.start + i)
+
+    def __iter__(self):
+        return (self.table.record(i) for i in range(self.start, self.stop))
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+    def __radd__(self, other):
+        return list(other) + list(self)
+
+
+class LocationTable:
+    """Column storage of neighborhoods and facilities, in that order. This is
+    the only copy of the location records; record(i) rebuilds one as a dict."""
+
+    __slots__ = ('ids', 'raw_ids', 'index', 'names', 'types', 'population', 'x', 'y', '_columns')
+
+    def __init__(self, locations):
+        self._columns = _Columns(locations, LOCATION_DEFAULTS)
+        columns = self._columns.columns
+        self.raw_ids = columns.get('id', [])
+        self.ids = [str(i) for i in self.raw_ids]
+        self.index = {}
+        for i, location_id in enumerate(self.ids):
+            self.index.setdefault(location_id, i)
+        self.names = columns['name']
+        self.types = columns['type']
+        self.population = columns['population']
+        self.x = columns.get('x', array('d'))
+        self.y = columns.get('y', array('d'))
+
+    def __len__(self):
+        return self._columns.count
+
+    def record(self, i):
+        return self._columns.record(i)
+
+
+class RoadTable:
+    """Column storage of a road list; endpoints are also resolved to
+    LocationTable positions (-1 when unknown). This is the only copy of the
+    road records; record(i) rebuilds one as a dict."""
+
+    __slots__ = ('from_ids', 'to_ids', 'from_index', 'to_index', 'distance', 'capacity', 'condition', 'cost', '_columns')
+
+    def __init__(self, roads, locations):
+        self._columns = _Columns(roads, ROAD_DEFAULTS)
+        columns = self._columns.columns
+        self.from_ids = columns.get('from', [])
+        self.to_ids = columns.get('to', [])
+        self.from_index = array('i', (locations.index.get(str(i), -1) for i in self.from_ids))
+        self.to_index = array('i', (locations.index.get(str(i), -1) for i in self.to_ids))
+        self.distance = columns.get('distance', array('d'))
+        self.capacity = columns.get('capacity', array('d'))
+        self.condition = columns['condition']
+        self.cost = columns['cost']
+
+    def __len__(self):
+        return self._columns.count
+
+    def record(self, i):
+        return self._columns.record(i)
@@ -0,0 +1,158 @@
+import hashlib
+import json
+import math
+
+# Web-mercator tiles (z/x/y, 256 px). From DETAIL_ZOOM up tiles carry every
+# location and road as is; below it nearby locations are merged into clusters
+# on a CLUSTER_PIXELS grid, the roads between two clusters become one, and
+# under MAJOR_ROAD_ZOOM only roads of MAJOR_ROAD_CAPACITY or more are kept.
+TILE_SIZE = 256
+MAX_ZOOM = 18
+DETAIL_ZOOM = 13
+MAJOR_ROAD_ZOOM = 10
+MAJOR_ROAD_CAPACITY = 3000  # vehicles/hour
+CLUSTER_PIXELS = 24
+
+
+def world_pixel(x, y, z):
+    """Web-mercator pixel coordinates of a longitude/latitude at zoom z"""
+    scale = TILE_SIZE * 2 ** z
+    lat = math.radians(max(-85.05112878, min(85.05112878, y)))
+    px = (x + 180.0) / 360.0 * scale
+    py = (1 - math.log(math.tan(lat) + 1 / math.cos(lat)) / math.pi) / 2 * scale
+    return px, py
+
+
+class ZoomTiles:
+    """Every non-empty tile of one zoom level, serialized once with its ETag.
+    Tiles depend on locations and roads only, not traffic."""
+
+    def __init__(self, cairo_data, z):
+        self.z = z
+        self.precision = self._precision(z)
+        features = self._detailed(cairo_data) if z >= DETAIL_ZOOM else self._clustered(cairo_data)
+
+        tiles = {}
+        for kind, feature, pixels in features:
+            for tile in self._tiles_covering(pixels):
+                tiles.setdefault(tile, {'locations': [], 'roads': []})[kind].append(feature)
+
+        self.tiles = {tile: self._serialize(tile, body) for tile, body in tiles.items()}
+
+    def get(self, x, y):
+        # (JSON body, ETag); tiles with nothing in them share an empty body
+        entry = self.tiles.get((x, y))
+        if entry is None:
+            entry = self._serialize((x, y), {'locations': [], 'roads': []})
+        return entry
+
+    def _serialize(self, tile, body):
+        body = {'z': self.z, 'x': tile[0], 'y': tile[1], 'detail': self.z >= DETAIL_ZOOM, **body}
+        text = json.dumps(body, separators=(',', ':'))
+        etag = hashlib.sha1(text.encode('utf-8')).hexdigest()[:20]
+        return text, etag
+
+    def _precision(self, z):
+        # Decimal places resolving about one pixel at this zoom
+        degrees_per_pixel = 360.0 / (TILE_SIZE * 2 ** z)
+        return max(1, min(7, math.ceil(-math.log10(degrees_per_pixel))))
+
+    def _coords(self, x, y):
+        return [round(y, self.precision), round(x, self.precision)]
+
+    def _tiles_covering(self, pixels):
+        # Tiles touched by the bounding box of a point or segment
+        xs = [p[0] for p in pixels]
+        ys = [p[1] for p in pixels]
+        last = 2 ** self.z - 1
+        for tx in range(max(0, int(min(xs) // TILE_SIZE)), min(last, int(max(xs) // TILE_SIZE)) + 1):
+            for ty in range(max(0, int(min(ys) // TILE_SIZE)), min(last, int(max(ys) // TILE_SIZE)) + 1):
+                yield tx, ty
+
+    def _locations(self, cairo_data):
+        return [('neighborhood', loc) for loc in cairo_data.neighborhoods] + \
+               [('facility', loc) for loc in cairo_data.facilities]
+
+    def _detailed(self, cairo_data):
+        features = []
+        positions = {}
+        for kind, loc in self._locations(cairo_data):
+            pixel = world_pixel(loc['x'], loc['y'], self.z)
+            positions[str(loc['id'])] = (loc, pixel)
+            features.append(('locations', {
+                'id': loc['id'],
+                'name': loc['name'],
+                'type': loc['type'],
+                'kind': kind,
+                'population': loc.get('population', 0),
+                'coords': self._coords(loc['x'], loc['y'])
+            }, [pixel]))
+
+        for road in cairo_data.existing_roads:
+            a, b = positions.get(str(road['from'])), positions.get(str(road['to']))
+            if a is None or b is None:
+                continue
+            features.append(('roads', {
+                **road,
+                'coords': [self._coords(a[0]['x'], a[0]['y']), self._coords(b[0]['x'], b[0]['y'])]
+            }, [a[1], b[1]]))
+        return features
+
+    def _clustered(self, cairo_data):
+        # Locations falling in the same grid cell become one cluster, placed
+        # at their mean position and named after its most populous member
+        clusters = {}
+        cluster_of = {}
+        for kind, loc in self._locations(cairo_data):
+            px, py = world_pixel(loc['x'], loc['y'], self.z)
+            cell = (int(px // CLUSTER_PIXELS), int(py // CLUSTER_PIXELS))
+            clusters.setdefault(cell, []).append((kind, loc))
+            cluster_of[str(loc['id'])] = cell
+
+        features = []
+        centers = {}
+        for cell, members in clusters.items():
+            x = sum(loc['x'] for _, loc in members) / len(members)
+            y = sum(loc['y'] for _, loc in members) / len(members)
+            kind, head = max(members, key=lambda m: (m[1].get('population', 0), m[0] == 'facility'))
+            centers[cell] = (x, y, world_pixel(x, y, self.z), head['id'])
+            features.append(('locations', {
+                'id': head['id'],
+                'name': head['name'] if len(members) == 1 else f"{head['name']} +{len(members) - 1}",
+                'type': head['type'] if len(members) == 1 else 'Cluster',
+                'kind': kind if len(members) == 1 else 'cluster',
+                'population': sum(loc.get('population', 0) for _, loc in members),
+                'members': [loc['id'] for _, loc in members],
+                'coords': self._coords(x, y)
+            }, [centers[cell][2]]))
+
+        # Roads between the same two clusters are drawn once, with their
+        # combined capacity; roads inside a cluster disappear
+        merged = {}
+        min_capacity = MAJOR_ROAD_CAPACITY if self.z < MAJOR_ROAD_ZOOM else 0
+        for road in cairo_data.existing_roads:
+            a, b = cluster_of.get(str(road['from'])), cluster_of.get(str(road['to']))
+            if a is None or b is None or a == b or road['capacity'] < min_capacity:
+                continue
+            key = (a, b) if a <= b else (b, a)
+            entry = merged.setdefault(key, {'capacity': 0, 'distance': math.inf, 'roads': 0})
+            entry['capacity'] += road['capacity']
+            entry['distance'] = min(entry['distance'], road['distance'])
+            entry['roads'] += 1
+
+        for (a, b), entry in merged.items():
+            ax, ay, a_pixel, a_id = centers[a]
+            bx, by, b_pixel, b_id = centers[b]
+            features.append(('roads', {
+                'from': a_id,
+                'to': b_id,
+                **entry,
+                'coords': [self._coords(ax, ay), self._coords(bx, by)]
+            }, [a_pixel, b_pixel]))
+        return features
+
+
+def get_zoom_tiles(cairo_data, z):
+    """Tiles of one zoom level, built on first use and kept with the
+    compiled graphs until the data is reloaded"""
+    return cairo_data.get_compiled_graph(('tiles', z), lambda: ZoomTiles(cairo_data, z))
@@ -0,0 +1,228 @@
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from data.cairo_data import TIME_SLOTS
+
+# Load-test harness for the API. Replays a weighted mix of requests with
+# concurrent workers, either against the Flask app in-process or against a
+# running server (--url), and reports throughput and latency percentiles per
+# request kind. Thresholds such as --threshold shortest_path.p95=50 (ms) or
+# --threshold all.p99=500 make the exit status fail on regressions.
+#
+#   python load_test.py --requests 2000 --concurrency 8
+#   python load_test.py --url http://127.0.0.1:5000 --mix shortest_path=5,road_network=1
+
+PERCENTILES = (50, 95, 99)
+
+# name -> (method, path, default weight)
+REQUEST_KINDS = {
+    'road_network': ('GET', '/api/road_network', 1),
+    'shortest_path': ('POST', '/api/shortest_path', 8),
+    'emergency_route': ('POST', '/api/emergency_route', 4),
+    'optimize_network': ('POST', '/api/optimize_network', 1),
+    'optimize_transport': ('POST', '/api/optimize_transport', 1),
+    'optimize_signals': ('POST', '/api/optimize_signals', 1)
+}
+
+
+def make_body(kind, location_ids, hospital_ids, rng):
+    # Random but valid payload for each request kind
+    if kind == 'shortest_path':
+        start, end = rng.sample(location_ids, 2)
+        return {'start': start, 'end': end, 'time_of_day': rng.choice(TIME_SLOTS)}
+    if kind == 'emergency_route':
+        end = rng.choice(hospital_ids)
+        start = rng.choice([loc for loc in location_ids if loc != end])
+        return {'start': start, 'end': end, 'time_of_day': rng.choice(TIME_SLOTS)}
+    if kind == 'optimize_network':
+        return {'algorithm': rng.choice(['prim', 'kruskal']), 'prioritize_population': rng.random() < 0.5}
+    if kind == 'optimize_transport':
+        return {}
+    if kind == 'optimize_signals':
+        return {'time_of_day': rng.choice(TIME_SLOTS)}
+    return None
+
+
+def parse_mix(value):
+    # "shortest_path=5,road_network=1" -> {name: weight}
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in REQUEST_KINDS:
+            raise argparse.ArgumentTypeError(f"unknown request kind '{name}'")
+        mix[name] = float(weight) if weight else 1.0
+    return mix
+
+
+def parse_threshold(value):
+    # "shortest_path.p95=50" -> ('shortest_path', 'p95', 50.0)
+    target, _, limit = value.partition('=')
+    name, _, metric = target.partition('.')
+    if not limit or metric not in [f'p{p}' for p in PERCENTILES] + ['mean', 'max', 'error_rate']:
+        raise argparse.ArgumentTypeError(f"invalid threshold '{value}'")
+    if name != 'all' and name not in REQUEST_KINDS:
+        raise argparse.ArgumentTypeError(f"unknown request kind '{name}'")
+    return name, metric, float(limit)
+
+
+class InProcessClient:
+    # One Flask test client per worker thread
+    def __init__(self, headers=None):
+        from app import app
+        self.app = app
+        self.headers = headers or {}
+        self._local = threading.local()
+
+    def request(self, method, path, body):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, json=body, headers=self.headers)
+        return response.status_code, response.get_data()
+
+
+class HttpClient:
+    def __init__(self, base_url, timeout, headers=None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.headers = headers or {}
+
+    def request(self, method, path, body):
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        req = urllib.request.Request(
+            self.base_url + path, data=data, method=method,
+            headers={**self.headers, 'Content-Type': 'application/json'} if data is not None else self.headers
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+
+def percentile(sorted_values, p):
+    # Nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-p * len(sorted_values) // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    count = len(latencies)
+    stats = {
+        'requests': count,
+        'errors': errors,
+        'error_rate': errors / count if count else 0.0,
+        'throughput': count / elapsed if elapsed > 0 else 0.0,
+        'mean': sum(latencies) / count if count else 0.0,
+        'max': latencies[-1] if latencies else 0.0
+    }
+    for p in PERCENTILES:
+        stats[f'p{p}'] = percentile(latencies, p)
+    return stats
+
+
+def run_load_test(client, mix, total_requests, concurrency, warmup=0, seed=None):
+    # Returns {kind: stats, 'all': stats}; latencies are in milliseconds
+    status, body = client.request('GET', '/api/road_network', None)
+    if status != 200:
+        raise RuntimeError(f'could not load the road network (HTTP {status})')
+    network = json.loads(body)
+    location_ids = [str(loc['id']) for loc in network['neighborhoods'] + network['facilities']]
+    hospital_ids = [str(f['id']) for f in network['facilities'] if 'Medical' in f['type']]
+
+    rng = random.Random(seed)
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    plan = []
+    for kind in rng.choices(kinds, weights=weights, k=warmup + total_requests):
+        method, path, _ = REQUEST_KINDS[kind]
+        plan.append((kind, method, path, make_body(kind, location_ids, hospital_ids, rng)))
+
+    def send(item):
+        kind, method, path, body = item
+        started = time.perf_counter()
+        try:
+            status, _ = client.request(method, path, body)
+        except (OSError, ValueError):
+            status = None
+        return kind, (time.perf_counter() - started) * 1000, status is None or status >= 400
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(send, plan[:warmup]))
+
+        started = time.perf_counter()
+        results = list(pool.map(send, plan[warmup:]))
+        elapsed = time.perf_counter() - started
+
+    report = {}
+    for kind in kinds + ['all']:
+        selected = [r for r in results if kind == 'all' or r[0] == kind]
+        if selected:
+            report[kind] = summarize([r[1] for r in selected], sum(1 for r in selected if r[2]), elapsed)
+    return report
+
+
+def check_thresholds(report, thresholds):
+    failures = []
+    for name, metric, limit in thresholds:
+        stats = report.get(name)
+        if stats is not None and stats[metric] > limit:
+            failures.append(f"{name}.{metric} = {stats[metric]:.3f} exceeds {limit:g}")
+    return failures
+
+
+def format_report(report):
+    columns = ['requests', 'errors', 'throughput', 'mean'] + [f'p{p}' for p in PERCENTILES] + ['max']
+    lines = [f"{'kind':<20}" + ''.join(f'{c:>12}' for c in columns)]
+    for kind, stats in report.items():
+        cells = [f"{stats['requests']:>12}", f"{stats['errors']:>12}", f"{stats['throughput']:>10.1f}/s"]
+        cells += [f"{stats[c]:>10.2f}ms" for c in columns[3:]]
+        lines.append(f'{kind:<20}' + ''.join(cells))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay a request mix against the API and report latency percentiles.')
+    parser.add_argument('--url', help='base URL of a running server; the app is loaded in-process when omitted')
+    parser.add_argument('--mix', type=parse_mix, default={name: kind[2] for name, kind in REQUEST_KINDS.items()},
+                        help='comma-separated kind=weight pairs, e.g. shortest_path=5,road_network=1')
+    parser.add_argument('--requests', type=int, default=500, help='measured requests')
+    parser.add_argument('--warmup', type=int, default=50, help='requests sent before measuring')
+    parser.add_argument('--concurrency', type=int, default=4, help='concurrent workers')
+    parser.add_argument('--timeout', type=float, default=30.0, help='per-request timeout in seconds (--url only)')
+    parser.add_argument('--seed', type=int, help='random seed for a reproducible request mix')
+    parser.add_argument('--threshold', type=parse_threshold, action='append', default=[],
+                        help='fail when kind.metric exceeds a limit, e.g. all.p95=200 or shortest_path.error_rate=0')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='send Cache-Control: no-cache so the shared result cache is bypassed')
+    args = parser.parse_args(argv)
+
+    headers = {'Cache-Control': 'no-cache'} if args.no_cache else None
+    client = HttpClient(args.url, args.timeout, headers) if args.url else InProcessClient(headers)
+    report = run_load_test(client, args.mix, args.requests, args.concurrency, args.warmup, args.seed)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_report(report))
+
+    failures = check_thresholds(report, args.threshold)
+    for failure in failures:
+        print(f'FAIL {failure}', file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,233 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+class _StackProfile:
+    # Collapsed-stack results shared by both profilers: stacks maps a tuple
+    # of frame labels (root first) to its weight in the profiler's unit
+
+    unit = 'samples'
+
+    def __init__(self):
+        self.stacks = Counter()
+        self.duration = 0.0
+        self._labels = {}
+
+    @property
+    def total(self):
+        return sum(self.stacks.values())
+
+    def collapsed(self):
+        # One "frame;frame;frame weight" line per distinct stack, the input
+        # format of flamegraph.pl, speedscope and inferno
+        return '\n'.join(
+            f"{';'.join(stack)} {weight}" for stack, weight in sorted(self.stacks.items()) if weight
+        )
+
+    def write_collapsed(self, path, max_files=None):
+        # With max_files, the oldest .folded files in the directory beyond
+        # that many are deleted afterwards
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.collapsed())
+            f.write('\n')
+        if max_files is not None:
+            prune_profiles(directory or '.', max_files)
+
+    def hot_functions(self, prefix='algorithms/', limit=10):
+        # Functions under prefix ranked by weight spent in their own code,
+        # with the inclusive weight (recursion counted once per stack)
+        own = Counter()
+        inclusive = Counter()
+        for stack, weight in self.stacks.items():
+            if stack[-1].startswith(prefix):
+                own[stack[-1]] += weight
+            for label in set(stack):
+                if label.startswith(prefix):
+                    inclusive[label] += weight
+
+        total = self.total
+        ranked = sorted(inclusive, key=lambda label: (-own[label], -inclusive[label], label))[:limit]
+        return [
+            {
+                'function': label,
+                'self': own[label],
+                'total': inclusive[label],
+                'self_percent': round(100 * own[label] / total, 1) if total else 0,
+                'total_percent': round(100 * inclusive[label] / total, 1) if total else 0
+            }
+            for label in ranked
+        ]
+
+    def summary(self):
+        return {
+            'unit': self.unit,
+            'total': self.total,
+            'duration_ms': self.duration * 1000,
+            'hot_functions': self.hot_functions()
+        }
+
+    def _label(self, code):
+        # "path/relative/to/repo.py:function", or the absolute path for
+        # library code; ';' and spaces would break the collapsed format
+        label = self._labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            if filename.startswith(ROOT + os.sep):
+                filename = os.path.relpath(filename, ROOT).replace(os.sep, '/')
+            name = getattr(code, 'co_qualname', code.co_name)
+            label = f"{filename}:{name}".replace(';', ':').replace(' ', '_')
+            self._labels[code] = label
+        return label
+
+
+def prune_profiles(directory, max_files):
+    """Delete the oldest .folded files in directory beyond max_files"""
+    try:
+        paths = [entry.path for entry in os.scandir(directory) if entry.name.endswith('.folded')]
+    except OSError:
+        return
+    if len(paths) <= max_files:
+        return
+    paths.sort(key=lambda path: (_mtime(path), path))
+    for path in paths[:len(paths) - max_files]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+class SamplingProfiler(_StackProfile):
+    """Statistical profiler for one thread.
+
+    A background thread samples the target thread's call stack every
+    interval seconds, by default the interpreter switch interval. The
+    sampler needs the GIL, so while the target runs pure Python it samples
+    at most once per switch interval; the interval actually achieved is
+    reported in the summary. The process-wide switch interval is left
+    alone."""
+
+    def __init__(self, thread_id=None, interval=None):
+        super().__init__()
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval if interval is not None else sys.getswitchinterval()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._started_at = None
+
+    def start(self):
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self._started_at
+
+    def summary(self):
+        total = self.total
+        return {
+            **super().summary(),
+            'interval_ms': self.interval * 1000,
+            'effective_interval_ms': self.duration * 1000 / total if total else None
+        }
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            self.stacks[tuple(stack)] += 1
+
+
+class TracingProfiler(_StackProfile):
+    """Deterministic profiler for the calling thread.
+
+    Every call and return (including C functions) is seen through
+    sys.setprofile and the time between events is charged to the current
+    stack, in microseconds. Exact even for requests too short to sample,
+    at the cost of slowing pure-Python code down several times."""
+
+    unit = 'microseconds'
+
+    def __init__(self):
+        super().__init__()
+        self._root = {}
+        self._path = []  # [(label, children), ...] from the root down
+        self._times = {}  # id(children) -> accumulated seconds
+        self._nodes = {}  # id(children) -> stack tuple
+        self._last = None
+        self._started_at = None
+
+    def start(self):
+        # Seed the path with the frames already on the stack so returns
+        # out of them unwind correctly
+        frames = []
+        frame = sys._getframe(1)
+        while frame is not None:
+            frames.append(frame.f_code)
+            frame = frame.f_back
+        for code in reversed(frames):
+            self._push(self._label(code))
+
+        self._started_at = self._last = time.perf_counter()
+        sys.setprofile(self._event)
+
+    def stop(self):
+        sys.setprofile(None)
+        now = time.perf_counter()
+        self._charge(now)
+        self.duration = now - self._started_at
+
+        for key, seconds in self._times.items():
+            self.stacks[self._nodes[key]] += int(seconds * 1e6)
+
+    def _event(self, frame, event, arg):
+        self._charge(time.perf_counter())
+        if event == 'call':
+            self._push(self._label(frame.f_code))
+        elif event == 'c_call':
+            self._push(self._c_label(arg))
+        elif self._path and event in ('return', 'c_return', 'c_exception'):
+            self._path.pop()
+        self._last = time.perf_counter()
+
+    def _charge(self, now):
+        if self._path:
+            key = id(self._path[-1][1])
+            self._times[key] = self._times.get(key, 0.0) + (now - self._last)
+
+    def _push(self, label):
+        parent = self._path[-1][1] if self._path else self._root
+        children = parent.get(label)
+        if children is None:
+            children = parent[label] = {}
+            self._nodes[id(children)] = tuple(entry[0] for entry in self._path) + (label,)
+        self._path.append((label, children))
+
+    def _c_label(self, function):
+        # Not cached: bound builtin methods are new objects on every call
+        module = getattr(function, '__module__', None) or 'builtins'
+        name = getattr(function, '__qualname__', None) or getattr(function, '__name__', 'unknown')
+        return f"{module}:{name}".replace(';', ':').replace(' ', '_')